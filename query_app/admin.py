@@ -3,8 +3,8 @@ from .models import QueryHistory
 
 @admin.register(QueryHistory)
 class QueryHistoryAdmin(admin.ModelAdmin):
-    list_display = ['natural_query', 'success', 'execution_time', 'created_at']
-    list_filter = ['success', 'created_at']
+    list_display = ['natural_query', 'database', 'success', 'execution_time', 'total_latency', 'model_name', 'created_at']
+    list_filter = ['success', 'database', 'model_name', 'decomposed', 'fallback', 'created_at']
     search_fields = ['natural_query', 'generated_sql']
     readonly_fields = ['created_at']
     list_per_page = 25
\ No newline at end of file
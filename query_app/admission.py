@@ -0,0 +1,123 @@
+"""
+Admission control for the LLM and database stages.
+Bounds concurrency and queueing per stage and sheds load early when saturated.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+from .config import ServiceConfig
+
+WAIT_SAMPLE_SIZE = 200
+
+
+class AdmissionRejected(Exception):
+    """Raised when a stage is saturated and the request should be retried later."""
+
+    def __init__(self, stage: str, retry_after: int, status_code: int = 503, message: str = ''):
+        self.stage = stage
+        self.retry_after = retry_after
+        self.status_code = status_code
+        self.message = message or f"The {stage} stage is overloaded, retry in {retry_after}s."
+        super().__init__(self.message)
+
+    def __reduce__(self):
+        # Shared coalescing pickles the leader's exception into the cache for followers
+        return self.__class__, (self.stage, self.retry_after, self.status_code, self.message)
+
+
+class ConcurrencyLimiter:
+    """Semaphore with a bounded wait queue, a wait timeout and queue statistics."""
+
+    def __init__(self, stage: str, max_concurrency: int, max_queue: int, max_wait: float):
+        self.stage = stage
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._holds = deque(maxlen=WAIT_SAMPLE_SIZE)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one concurrency slot for the duration of the block."""
+        start = time.time()
+        with self._condition:
+            if self._active >= self.max_concurrency and self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise AdmissionRejected(self.stage, self._retry_after())
+
+            self._waiting += 1
+            try:
+                while self._active >= self.max_concurrency:
+                    remaining = self.max_wait - (time.time() - start)
+                    if remaining <= 0:
+                        self._rejected += 1
+                        raise AdmissionRejected(self.stage, self._retry_after())
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self._admitted += 1
+            self._waits.append(time.time() - start)
+
+        acquired = time.time()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._holds.append(time.time() - acquired)
+                self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current queue depth and wait-time statistics."""
+        with self._condition:
+            waits = sorted(self._waits)
+            return {
+                'active': self._active,
+                'queue_depth': self._waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'avg_wait': sum(waits) / len(waits) if waits else 0.0,
+                'p95_wait': waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                'max_wait': waits[-1] if waits else 0.0,
+            }
+
+    def _retry_after(self) -> int:
+        """Estimate seconds until the queue drains, from recent hold times."""
+        avg_hold = sum(self._holds) / len(self._holds) if self._holds else 1.0
+        backlog = self._waiting + 1
+        return max(1, math.ceil(avg_hold * backlog / self.max_concurrency))
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(stage: str) -> ConcurrencyLimiter:
+    """Get the process-wide limiter for a stage ('llm' or 'db')."""
+    with _limiters_lock:
+        if stage not in _limiters:
+            config = ServiceConfig.get_admission_config()
+            prefix = stage.upper()
+            _limiters[stage] = ConcurrencyLimiter(
+                stage,
+                max_concurrency=config[f'{prefix}_MAX_CONCURRENCY'],
+                max_queue=config[f'{prefix}_MAX_QUEUE'],
+                max_wait=config[f'{prefix}_MAX_WAIT'],
+            )
+        return _limiters[stage]
+
+
+def get_admission_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for the LLM and database stage limiters."""
+    return {stage: get_limiter(stage).stats() for stage in ('llm', 'db')}
@@ -0,0 +1,149 @@
+"""
+Query performance analytics over QueryHistory.
+All aggregation runs in the database; percentiles use ordered offset lookups so they work on every backend.
+"""
+import math
+import re
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+from django.db.models import Avg, Count, F, Max, Q, QuerySet, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+from .models import QueryHistory
+
+WINDOW_PATTERN = re.compile(r'^(\d+)([hd])$')
+MAX_WINDOW = timedelta(days=90)
+LATENCY_FIELDS = ('total_latency', 'llm_latency', 'execution_time')
+PERCENTILES = (50, 95, 99)
+
+
+def parse_window(window: str) -> timedelta:
+    """Parse windows such as '1h', '24h' or '7d'; raises ValueError otherwise."""
+    match = WINDOW_PATTERN.match(window or '')
+    if not match:
+        raise ValueError(f"Invalid window '{window}', expected e.g. 1h, 24h or 7d")
+    amount, unit = int(match.group(1)), match.group(2)
+    delta = timedelta(hours=amount) if unit == 'h' else timedelta(days=amount)
+    if delta <= timedelta(0) or delta > MAX_WINDOW:
+        raise ValueError(f"Window must be between 1h and {MAX_WINDOW.days}d")
+    return delta
+
+
+class QueryAnalytics:
+    """
+    Latency percentiles, error rates and top slow/expensive questions over a time window.
+    Fallback answers served while the model was unavailable are only counted, not measured.
+    """
+
+    def __init__(self, window: timedelta, database: Optional[str] = None, top: int = 10):
+        self.window = window
+        self.top = top
+        queryset = QueryHistory.objects.filter(created_at__gte=timezone.now() - window)
+        if database:
+            queryset = queryset.filter(database=database)
+        self.fallbacks = queryset.exclude(fallback='').order_by()
+        self.queryset = queryset.filter(fallback='').order_by()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'window_seconds': int(self.window.total_seconds()),
+            'summary': self.summary(),
+            'latency_percentiles': self.latency_percentiles(),
+            'timeseries': self.timeseries(),
+            'by_model': self.by_model(),
+            'top_slow': self.top_slow(),
+            'top_expensive': self.top_expensive(),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        totals = self.queryset.aggregate(
+            requests=Count('id'),
+            errors=Count('id', filter=Q(success=False)),
+            avg_latency=Avg('total_latency'),
+            prompt_tokens=Coalesce(Sum('prompt_tokens'), 0),
+            completion_tokens=Coalesce(Sum('completion_tokens'), 0),
+            cached_tokens=Coalesce(Sum('cached_tokens'), 0),
+            result_bytes=Coalesce(Sum('result_bytes'), 0),
+        )
+        totals['error_rate'] = totals['errors'] / totals['requests'] if totals['requests'] else None
+        totals['fallbacks'] = self.fallbacks.count()
+        return totals
+
+    def latency_percentiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Nearest-rank p50/p95/p99 for each latency field. Database time only counts
+        successful executions; older rows stored 0 for failures.
+        """
+        percentiles = {}
+        for field in LATENCY_FIELDS:
+            values = self.queryset.filter(**{f'{field}__isnull': False})
+            if field == 'execution_time':
+                values = values.filter(success=True)
+            count = values.count()
+            percentiles[field] = {
+                f'p{p}': self._value_at_rank(values, field, count, p) for p in PERCENTILES
+            }
+        return percentiles
+
+    def timeseries(self) -> List[Dict[str, Any]]:
+        trunc = TruncHour if self.window <= timedelta(days=2) else TruncDay
+        return list(
+            self.queryset
+            .annotate(bucket=trunc('created_at'))
+            .values('bucket')
+            .annotate(
+                requests=Count('id'),
+                errors=Count('id', filter=Q(success=False)),
+                avg_latency=Avg('total_latency'),
+                max_latency=Max('total_latency'),
+                tokens=Coalesce(Sum('prompt_tokens'), 0) + Coalesce(Sum('completion_tokens'), 0),
+            )
+            .order_by('bucket')
+        )
+
+    def by_model(self) -> List[Dict[str, Any]]:
+        return list(
+            self.queryset.exclude(model_name='')
+            .values('model_name')
+            .annotate(
+                requests=Count('id'),
+                errors=Count('id', filter=Q(success=False)),
+                avg_llm_latency=Avg('llm_latency'),
+                prompt_tokens=Coalesce(Sum('prompt_tokens'), 0),
+                completion_tokens=Coalesce(Sum('completion_tokens'), 0),
+            )
+            .order_by('-requests')
+        )
+
+    def top_slow(self) -> List[Dict[str, Any]]:
+        return list(
+            self.queryset.filter(total_latency__isnull=False)
+            .values('natural_query')
+            .annotate(
+                requests=Count('id'),
+                avg_latency=Avg('total_latency'),
+                max_latency=Max('total_latency'),
+                avg_execution_time=Avg('execution_time'),
+            )
+            .order_by('-avg_latency')[:self.top]
+        )
+
+    def top_expensive(self) -> List[Dict[str, Any]]:
+        return list(
+            self.queryset.filter(prompt_tokens__isnull=False)
+            .values('natural_query')
+            .annotate(
+                requests=Count('id'),
+                total_tokens=Sum(F('prompt_tokens') + Coalesce(F('completion_tokens'), 0)),
+                cached_tokens=Coalesce(Sum('cached_tokens'), 0),
+                avg_llm_latency=Avg('llm_latency'),
+            )
+            .order_by('-total_tokens')[:self.top]
+        )
+
+    @staticmethod
+    def _value_at_rank(values: QuerySet, field: str, count: int, percentile: int) -> Optional[float]:
+        if not count:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * count))
+        return values.order_by(field).values_list(field, flat=True)[rank - 1]
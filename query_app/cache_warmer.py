@@ -0,0 +1,97 @@
+"""
+Off-peak cache warming for the most frequent successful questions.
+Replays hot questions through the normal query path so the translation and
+result caches are filled before peak hours.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as clock, timedelta
+from typing import Dict, Any, List, Tuple
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.utils import timezone
+from .admission import AdmissionRejected
+from .coalescing import normalize_question
+from .models import QueryHistory
+from .services import QueryService
+
+logger = logging.getLogger(__name__)
+
+
+def parse_clock(value: str) -> clock:
+    """Parse 'HH:MM'; raises ValueError otherwise."""
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def in_off_peak(now: datetime, start: clock, end: clock) -> bool:
+    """Whether now's local time falls in [start, end), wrapping past midnight when start > end."""
+    current = timezone.localtime(now).time() if timezone.is_aware(now) else now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class CacheWarmer:
+    """Replay the hottest questions of one target with bounded concurrency."""
+
+    def __init__(self, database: str, top: int = 20, window: timedelta = timedelta(days=7),
+                 concurrency: int = 2):
+        self.database = database
+        self.top = top
+        self.window = window
+        self.concurrency = max(1, concurrency)
+
+    def hottest_questions(self) -> List[Dict[str, Any]]:
+        """
+        Most frequent successful questions in the window, merged by normalized text.
+        Questions asked with decomposition are kept apart so they are replayed the same way.
+        """
+        rows = (
+            QueryHistory.objects.filter(
+                database=self.database, success=True,
+                created_at__gte=timezone.now() - self.window,
+            )
+            .order_by()
+            .values('natural_query', 'decomposed')
+            .annotate(requests=Count('id'), last_asked=Max('created_at'))
+            .order_by('-requests')[:self.top * 5]
+        )
+        merged: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+        for row in rows:
+            key = (normalize_question(row['natural_query']), row['decomposed'])
+            entry = merged.setdefault(key, {
+                'question': row['natural_query'],
+                'decomposed': row['decomposed'],
+                'requests': 0,
+                'last_asked': row['last_asked'],
+            })
+            entry['requests'] += row['requests']
+            entry['last_asked'] = max(entry['last_asked'], row['last_asked'])
+        return sorted(merged.values(), key=lambda e: e['requests'], reverse=True)[:self.top]
+
+    def warm(self) -> List[Dict[str, Any]]:
+        """Warm every hot question; failures are reported per question and never raised."""
+        questions = self.hottest_questions()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cache-warmer') as executor:
+            return list(executor.map(self._warm_one, questions))
+
+    def _warm_one(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        outcome = {'question': entry['question'], 'requests': entry['requests']}
+        start_time = time.time()
+        try:
+            with QueryService(self.database) as query_service:
+                if entry['decomposed']:
+                    query_data = query_service.execute_decomposed_query(entry['question'], warming=True)
+                else:
+                    query_data = query_service.execute_natural_query(entry['question'], warming=True)
+            outcome.update(status='warmed', translation_cached=query_data['cache']['translation'])
+        except AdmissionRejected as e:
+            outcome.update(status='shed', error=str(e))
+        except Exception as e:
+            logger.warning("Cache warming failed for %r: %s", entry['question'], e)
+            outcome.update(status='failed', error=str(e))
+        finally:
+            close_old_connections()
+        outcome['elapsed'] = time.time() - start_time
+        return outcome
@@ -0,0 +1,140 @@
+"""
+Single-flight coalescing of identical in-flight queries.
+Concurrent callers with the same key wait for one leader and share its result.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+QUOTED_PATTERN = re.compile(r"""('[^']*'|"[^"]*")""")
+
+
+def normalize_question(natural_query: str) -> str:
+    """
+    Normalize a question so trivially different phrasings share a key.
+    Quoted literals are kept verbatim: 'SHIPPED' and 'shipped' are different filters.
+    """
+    parts = QUOTED_PATTERN.split(natural_query.strip())
+    question = ''.join(
+        part if index % 2 else re.sub(r'\s+', ' ', part.lower())
+        for index, part in enumerate(parts)
+    )
+    return question.rstrip(' ?.!;')
+
+
+def coalescing_key(*parts: str) -> str:
+    """Build a compact cache-safe key from its parts."""
+    digest = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+    return f"query_app:flight:{digest}"
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls per key within this process and, optionally,
+    across workers through a lock and short-lived result in the shared cache.
+    """
+
+    def __init__(self, shared: bool = False, lock_timeout: float = 60,
+                 result_ttl: float = 30, poll_interval: float = 0.05):
+        self.shared = shared
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], deadline: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key.
+        Returns (result, shared) where shared is True for callers that waited on a leader.
+        Followers wait until the deadline (default: lock_timeout from now), then run fn themselves.
+        """
+        deadline = min(deadline or float('inf'), time.time() + self.lock_timeout)
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+        if not is_leader:
+            if not flight.done.wait(max(0.0, deadline - time.time())):
+                logger.warning("Timed out waiting on flight %s, running locally", key)
+                return fn(), False
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result, shared = self._run_shared(key, fn, deadline) if self.shared else (fn(), False)
+            return flight.result, shared
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _run_shared(self, key: str, fn: Callable[[], Any], deadline: float) -> Tuple[Any, bool]:
+        """Coalesce across workers: one process runs fn, the others poll for its outcome."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+
+        while not cache.add(lock_key, token, self.lock_timeout):
+            leader_token = cache.get(lock_key)
+            if leader_token is None:
+                continue  # leader just finished, try to take over
+
+            outcome = self._wait_for_outcome(key, lock_key, leader_token, deadline)
+            if outcome is not None:
+                succeeded, value = outcome
+                if not succeeded:
+                    raise value
+                return value, True
+            if time.time() >= deadline:
+                logger.warning("Timed out waiting on shared flight %s, running locally", key)
+                return fn(), False
+
+        try:
+            try:
+                result = fn()
+            except Exception as e:
+                self._publish(key, token, (False, e))
+                raise
+            self._publish(key, token, (True, result))
+            return result, False
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _wait_for_outcome(self, key: str, lock_key: str, leader_token: str, deadline: float):
+        result_key = f"{key}:{leader_token}"
+        while time.time() < deadline:
+            outcome = cache.get(result_key)
+            if outcome is not None:
+                return outcome
+            if cache.get(lock_key) != leader_token:
+                return cache.get(result_key)
+            time.sleep(self.poll_interval)
+        return None
+
+    def _publish(self, key: str, token: str, outcome: Tuple[bool, Any]) -> None:
+        try:
+            cache.set(f"{key}:{token}", outcome, self.result_ttl)
+        except Exception as e:
+            logger.warning("Could not publish shared flight result: %s", e)
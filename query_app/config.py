@@ -4,22 +4,47 @@ Applies DRY principles and centralizes configuration management.
 """
 import os
 from django.conf import settings
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+
+class UnknownTargetError(ValueError):
+    """Raised when a request names a target database that is not configured."""
 
 
 class DatabaseConfig:
     """Centralized database configuration management."""
     
+    DEFAULT_TARGET = 'default'
+    
     @staticmethod
     def get_external_db_config() -> Dict[str, Any]:
         """Get external database configuration from environment variables."""
+        return DatabaseConfig.get_target_config(DatabaseConfig.DEFAULT_TARGET)
+    
+    @staticmethod
+    def get_target_names() -> List[str]:
+        """Get the names of all configured target databases."""
+        names = [DatabaseConfig.DEFAULT_TARGET]
+        names.extend(name for name in getattr(settings, 'EXTERNAL_DATABASES', {}) if name not in names)
+        return names
+    
+    @staticmethod
+    def get_target_config(name: str) -> Dict[str, Any]:
+        """Get connection configuration for a named target database."""
+        if name == DatabaseConfig.DEFAULT_TARGET and name not in getattr(settings, 'EXTERNAL_DATABASES', {}):
+            target = settings.EXTERNAL_DATABASE
+        else:
+            target = getattr(settings, 'EXTERNAL_DATABASES', {}).get(name)
+            if target is None:
+                raise UnknownTargetError(f"Unknown target database: {name}")
+        
         config = {
-            'host': settings.EXTERNAL_DATABASE['HOST'],
-            'port': settings.EXTERNAL_DATABASE['PORT'],
-            'database_name': settings.EXTERNAL_DATABASE['NAME'],
-            'username': settings.EXTERNAL_DATABASE['USER'],
-            'password': settings.EXTERNAL_DATABASE['PASSWORD'],
-            'engine': settings.EXTERNAL_DATABASE['ENGINE']
+            'host': target.get('HOST'),
+            'port': target.get('PORT'),
+            'database_name': target.get('NAME'),
+            'username': target.get('USER'),
+            'password': target.get('PASSWORD'),
+            'engine': target.get('ENGINE')
         }
         
         # Validate required fields
@@ -30,13 +55,26 @@ class DatabaseConfig:
         return config
     
     @staticmethod
-    def validate_config() -> bool:
+    def validate_config(name: str = DEFAULT_TARGET) -> bool:
         """Validate that all required configuration is present."""
         try:
-            DatabaseConfig.get_external_db_config()
+            DatabaseConfig.get_target_config(name)
             return True
         except ValueError:
             return False
+    
+    @staticmethod
+    def get_registry_config() -> Dict[str, Any]:
+        """Get target registry limits: active targets, idle timeout, pool size, schema TTL."""
+        config = {
+            'MAX_ACTIVE_TARGETS': 16,
+            'IDLE_TIMEOUT': 900,
+            'POOL_SIZE': 5,
+            'POOL_TIMEOUT': 10.0,
+            'SCHEMA_CACHE_TTL': 300,
+        }
+        config.update(getattr(settings, 'TARGET_REGISTRY', {}))
+        return config
 
 
 class APIConfig:
@@ -51,26 +89,162 @@ class APIConfig:
     def validate_openai_key() -> bool:
         """Validate that OpenAI API key is present."""
         return bool(APIConfig.get_openai_key())
+    
+    @staticmethod
+    def get_model_routing_config() -> Dict[str, Any]:
+        """Get model routing thresholds, falling back to defaults for missing keys."""
+        config = {
+            'FAST_MODEL': 'gpt-4o-mini',
+            'STRONG_MODEL': 'gpt-4',
+            'FAST_MAX_TOKENS': 300,
+            'STRONG_MAX_TOKENS': 500,
+            'MAX_SCHEMA_TABLES': 40,
+            'MAX_QUESTION_WORDS': 25,
+            'MAX_TOUCHED_TABLES': 1,
+        }
+        config.update(getattr(settings, 'MODEL_ROUTING', {}))
+        return config
+    
+    @staticmethod
+    def get_sql_repair_attempts() -> int:
+        """Get how many times invalid SQL is sent back to the model for repair."""
+        return getattr(settings, 'SQL_REPAIR_MAX_ATTEMPTS', 2)
+    
+    @staticmethod
+    def get_llm_client_config() -> Dict[str, Any]:
+        """Get OpenAI client timeouts, request deadline, hedging and circuit breaker settings."""
+        config = {
+            'BASE_URL': None,
+            'TIMEOUT': 20.0,
+            'REQUEST_DEADLINE': 30.0,
+            'HEDGE_ENABLED': True,
+            'HEDGE_PERCENTILE': 95,
+            'HEDGE_MIN_DELAY': 0.5,
+            'HEDGE_MAX_INFLIGHT': 4,
+            'BREAKER_FAILURE_THRESHOLD': 5,
+            'BREAKER_RESET_TIMEOUT': 30.0,
+        }
+        config.update(getattr(settings, 'LLM_CLIENT', {}))
+        return config
+
+
+class ServiceConfig:
+    """Centralized tuning for the query service's performance features."""
+    
+    @staticmethod
+    def get_coalescing_config() -> Dict[str, Any]:
+        """Get single-flight coalescing settings, falling back to defaults."""
+        config = {
+            'ENABLED': True,
+            'SHARED': False,
+            'LOCK_TIMEOUT': 60,
+            'RESULT_TTL': 30,
+            'POLL_INTERVAL': 0.05,
+        }
+        config.update(getattr(settings, 'QUERY_COALESCING', {}))
+        return config
+    
+    @staticmethod
+    def get_admission_config() -> Dict[str, Any]:
+        """Get per-stage concurrency limits and OpenAI rate-limit backoff settings."""
+        config = {
+            'LLM_MAX_CONCURRENCY': 4,
+            'LLM_MAX_QUEUE': 16,
+            'LLM_MAX_WAIT': 10.0,
+            'DB_MAX_CONCURRENCY': 8,
+            'DB_MAX_QUEUE': 32,
+            'DB_MAX_WAIT': 5.0,
+            'RATE_LIMIT_RETRIES': 3,
+            'RATE_LIMIT_BACKOFF': 0.5,
+            'RATE_LIMIT_MAX_BACKOFF': 8.0,
+        }
+        config.update(getattr(settings, 'ADMISSION_CONTROL', {}))
+        return config
+    
+    @staticmethod
+    def get_query_cache_config() -> Dict[str, Any]:
+        """Get translation and result cache settings."""
+        config = {
+            'ENABLED': True,
+            'CACHE_ALIAS': 'default',
+            'TRANSLATION_TTL': 86400,
+            'RESULT_TTL': 300,
+            'MAX_RESULT_BYTES': 1048576,
+        }
+        config.update(getattr(settings, 'QUERY_CACHE', {}))
+        return config
+    
+    @staticmethod
+    def get_cache_warming_config() -> Dict[str, Any]:
+        """Get the off-peak cache warming schedule and limits."""
+        config = {
+            'TOP_QUESTIONS': 20,
+            'HISTORY_WINDOW': '7d',
+            'CONCURRENCY': 2,
+            'OFF_PEAK_START': '01:00',
+            'OFF_PEAK_END': '05:00',
+            'INTERVAL': 600,
+            'RESULT_TTL': 600,
+        }
+        config.update(getattr(settings, 'CACHE_WARMING', {}))
+        return config
+    
+    @staticmethod
+    def get_decomposition_config() -> Dict[str, Any]:
+        """Get limits for splitting compound questions into parallel sub-queries."""
+        config = {
+            'MAX_SUB_QUERIES': 4,
+            'MAX_PARALLEL': 4,
+            'MODEL': None,
+            'MAX_TOKENS': 300,
+        }
+        config.update(getattr(settings, 'QUERY_DECOMPOSITION', {}))
+        return config
+    
+    @staticmethod
+    def get_history_retention_config() -> Dict[str, Any]:
+        """Get history age/count limits, purge batching and archive location."""
+        config = {
+            'MAX_AGE_DAYS': 90,
+            'MAX_ROWS': 100000,
+            'BATCH_SIZE': 1000,
+            'BATCH_PAUSE': 0.05,
+            'ARCHIVE_DIR': '',
+            'INTERVAL': 3600,
+        }
+        config.update(getattr(settings, 'HISTORY_RETENTION', {}))
+        return config
+    
+    @staticmethod
+    def get_index_advisor_config() -> Dict[str, Any]:
+        """Get the slow-query threshold and limits for index suggestions."""
+        config = {
+            'LATENCY_THRESHOLD': 1.0,
+            'MAX_QUERIES': 50,
+            'MIN_TABLE_ROWS': 1000,
+        }
+        config.update(getattr(settings, 'INDEX_ADVISOR', {}))
+        return config
 
 
 class ConfigValidator:
     """Configuration validation using CBT (Component-Based Testing) principles."""
     
     @staticmethod
-    def validate_all() -> Dict[str, bool]:
+    def validate_all(target: str = DatabaseConfig.DEFAULT_TARGET) -> Dict[str, bool]:
         """Validate all configuration components."""
         return {
-            'database': DatabaseConfig.validate_config(),
+            'database': DatabaseConfig.validate_config(target),
             'openai': APIConfig.validate_openai_key(),
         }
     
     @staticmethod
-    def get_validation_errors() -> Dict[str, str]:
+    def get_validation_errors(target: str = DatabaseConfig.DEFAULT_TARGET) -> Dict[str, str]:
         """Get detailed validation errors for each component."""
         errors = {}
         
         try:
-            DatabaseConfig.get_external_db_config()
+            DatabaseConfig.get_target_config(target)
         except ValueError as e:
             errors['database'] = str(e)
         
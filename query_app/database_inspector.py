@@ -1,42 +1,175 @@
+import hashlib
+import json
+import threading
+import time
 import psycopg2
 import pymysql
-from typing import Dict, List, Any
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Iterator, Optional
+
+
+def schema_fingerprint(schema_info: Dict[str, Any]) -> str:
+    """Stable hash of the engine and table definitions of a schema snapshot."""
+    payload = json.dumps(
+        {'engine': schema_info.get('engine'), 'tables': schema_info.get('tables', {})},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class QueryExecutionError(Exception):
+    """Raised when the database rejects or fails to run a generated query."""
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of DB-API connections for one target database."""
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 5, timeout: float = 10.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: List[Any] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection, returning it to the pool (or discarding it if broken)."""
+        conn = self._acquire()
+        healthy = True
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError,
+                pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            healthy = False
+            raise
+        finally:
+            self._release(conn, healthy)
+
+    def _acquire(self):
+        deadline = time.time() + self.timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a database connection")
+                self._condition.wait(remaining)
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, conn, healthy: bool) -> None:
+        if healthy:
+            try:
+                # End the implicit transaction so pooled connections never sit idle in one
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        with self._condition:
+            if healthy and not self._closed:
+                self._idle.append(conn)
+            else:
+                self._size -= 1
+                self._close_quietly(conn)
+            self._condition.notify()
+
+    def close_all(self) -> None:
+        """Close idle connections; borrowed ones are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle), 'max_size': self.max_size}
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
 
 class DatabaseInspector:
-    def __init__(self, connection_params: Dict[str, Any]):
+    def __init__(self, connection_params: Dict[str, Any], pool: Optional[ConnectionPool] = None):
         self.connection_params = connection_params
         self.engine = connection_params['engine']
+        self.pool = pool
     
     def get_connection(self):
+        """Open a read-only session, so the database refuses writes the validator missed."""
         if self.engine == 'postgresql':
-            return psycopg2.connect(
+            conn = psycopg2.connect(
                 host=self.connection_params['host'],
                 port=self.connection_params['port'],
                 database=self.connection_params['database_name'],
                 user=self.connection_params['username'],
                 password=self.connection_params['password']
             )
+            conn.set_session(readonly=True)
+            return conn
         elif self.engine == 'mysql':
-            return pymysql.connect(
+            conn = pymysql.connect(
                 host=self.connection_params['host'],
                 port=self.connection_params['port'],
                 database=self.connection_params['database_name'],
                 user=self.connection_params['username'],
                 password=self.connection_params['password']
             )
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION TRANSACTION READ ONLY")
+            return conn
+    
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a pooled connection, or open a one-off connection without a pool."""
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            conn = self.get_connection()
+            try:
+                yield conn
+            finally:
+                conn.close()
     
     def get_schema_info(self) -> Dict[str, Any]:
-        conn = self.get_connection()
+        with self.connection() as conn:
+            return self._get_schema_info(conn)
+    
+    def _get_schema_info(self, conn) -> Dict[str, Any]:
         cursor = conn.cursor()
         
         try:
             if self.engine == 'postgresql':
-                return self._get_postgresql_schema(cursor)
+                schema_info = self._get_postgresql_schema(cursor)
             elif self.engine == 'mysql':
-                return self._get_mysql_schema(cursor)
+                schema_info = self._get_mysql_schema(cursor)
+            else:
+                return None
+            schema_info['fingerprint'] = schema_fingerprint(schema_info)
+            return schema_info
         finally:
             cursor.close()
-            conn.close()
     
     def _get_postgresql_schema(self, cursor) -> Dict[str, Any]:
         # Get tables and columns
@@ -77,7 +210,20 @@ class DatabaseInspector:
                     'references_column': foreign_column
                 })
         
-        return {'tables': tables, 'engine': 'postgresql'}
+        # Planner row estimates, kept outside 'tables' so they don't change the fingerprint
+        cursor.execute("""
+            SELECT c.relname, c.reltuples::bigint
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind = 'r'
+        """)
+        # reltuples is -1 until the table is first vacuumed or analyzed: unknown, not empty
+        row_estimates = {
+            name: int(rows) if rows >= 0 else None
+            for name, rows in cursor.fetchall() if name in tables
+        }
+        
+        return {'tables': tables, 'engine': 'postgresql', 'row_estimates': row_estimates}
     
     def _get_mysql_schema(self, cursor) -> Dict[str, Any]:
         # Get tables and columns
@@ -116,14 +262,31 @@ class DatabaseInspector:
                     'references_column': foreign_column
                 })
         
-        return {'tables': tables, 'engine': 'mysql'}
+        # InnoDB row estimates, kept outside 'tables' so they don't change the fingerprint
+        cursor.execute("""
+            SELECT table_name, table_rows
+            FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'
+        """)
+        row_estimates = {
+            name: int(rows) if rows is not None else None
+            for name, rows in cursor.fetchall() if name in tables
+        }
+        
+        return {'tables': tables, 'engine': 'mysql', 'row_estimates': row_estimates}
     
     def execute_query(self, sql: str) -> Dict[str, Any]:
-        conn = self.get_connection()
+        with self.connection() as conn:
+            return self._execute_query(conn, sql)
+    
+    def _execute_query(self, conn, sql: str) -> Dict[str, Any]:
         cursor = conn.cursor()
         
         try:
-            cursor.execute(sql)
+            try:
+                cursor.execute(sql)
+            except (psycopg2.Error, pymysql.err.Error) as e:
+                raise QueryExecutionError(str(e)) from e
             
             if cursor.description:
                 columns = [desc[0] for desc in cursor.description]
@@ -137,4 +300,62 @@ class DatabaseInspector:
                 return {'message': 'Query executed successfully', 'row_count': cursor.rowcount}
         finally:
             cursor.close()
-            conn.close()
\ No newline at end of file
+    
+    def explain_query(self, sql: str) -> Any:
+        """
+        Return the planner's estimated plan without executing the query.
+        PostgreSQL: the root plan node (FORMAT JSON). MySQL: the EXPLAIN rows as dicts.
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                try:
+                    if self.engine == 'postgresql':
+                        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                        plan = cursor.fetchone()[0]
+                        if isinstance(plan, str):
+                            plan = json.loads(plan)
+                        return plan[0]['Plan']
+                    cursor.execute(f"EXPLAIN {sql}")
+                    columns = [desc[0] for desc in cursor.description]
+                    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                except (psycopg2.Error, pymysql.err.Error) as e:
+                    raise QueryExecutionError(str(e)) from e
+            finally:
+                cursor.close()
+    
+    def get_index_info(self) -> Dict[str, List[List[str]]]:
+        """Existing indexes as {table: [[column, ...], ...]} with columns in index order."""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if self.engine == 'postgresql':
+                    cursor.execute("""
+                        SELECT t.relname, i.relname, a.attname
+                        FROM pg_index ix
+                        JOIN pg_class t ON t.oid = ix.indrelid
+                        JOIN pg_class i ON i.oid = ix.indexrelid
+                        JOIN pg_namespace n ON n.oid = t.relnamespace
+                        CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, ord)
+                        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+                        WHERE n.nspname = 'public'
+                        ORDER BY t.relname, i.relname, k.ord
+                    """)
+                else:
+                    cursor.execute("""
+                        SELECT table_name, index_name, column_name
+                        FROM information_schema.statistics
+                        WHERE table_schema = DATABASE()
+                        ORDER BY table_name, index_name, seq_in_index
+                    """)
+                
+                indexes: Dict[tuple, List[str]] = {}
+                for table_name, index_name, column_name in cursor.fetchall():
+                    indexes.setdefault((table_name, index_name), []).append(column_name)
+                
+                index_info: Dict[str, List[List[str]]] = {}
+                for (table_name, _), columns in indexes.items():
+                    index_info.setdefault(table_name, []).append(columns)
+                return index_info
+            finally:
+                cursor.close()
\ No newline at end of file
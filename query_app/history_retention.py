@@ -0,0 +1,121 @@
+"""
+Query history retention.
+Purges rows beyond the age/count limits in small batches, archiving each batch
+to gzip-compressed JSONL once its delete has committed, and clears the whole
+table with TRUNCATE.
+"""
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import QueryHistory
+
+logger = logging.getLogger(__name__)
+
+
+def truncate_history() -> None:
+    """
+    Remove every history row without per-row work. TRUNCATE on PostgreSQL and
+    MySQL; SQLite has no TRUNCATE but optimizes an unqualified DELETE the same way.
+    """
+    table = connection.ops.quote_name(QueryHistory._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor in ('postgresql', 'mysql'):
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        else:
+            cursor.execute(f"DELETE FROM {table}")
+
+
+class HistoryRetention:
+    """Enforce max age and max row count on QueryHistory with bounded delete batches."""
+
+    def __init__(self, max_age: Optional[timedelta] = None, max_rows: Optional[int] = None,
+                 batch_size: int = 1000, batch_pause: float = 0.05, archive_dir: str = ''):
+        self.max_age = max_age
+        self.max_rows = max_rows
+        self.batch_size = max(1, batch_size)
+        self.batch_pause = batch_pause
+        self.archive_dir = archive_dir
+
+    def expired_filter(self) -> Optional[Q]:
+        """Rows older than max_age or beyond the newest max_rows; None when nothing is expired."""
+        conditions = Q()
+        if self.max_age is not None:
+            conditions |= Q(created_at__lt=timezone.now() - self.max_age)
+        if self.max_rows is not None:
+            # Ids grow with insertion time, so the boundary is the first id past the newest max_rows
+            boundary = list(
+                QueryHistory.objects.order_by('-id').values_list('id', flat=True)[self.max_rows:self.max_rows + 1]
+            )
+            if boundary:
+                conditions |= Q(id__lte=boundary[0])
+        return conditions or None
+
+    def purge(self) -> Dict[str, Any]:
+        """
+        Delete expired rows one batch per transaction. Each batch is staged to a
+        temp file first and appended to the archive only after its delete commits,
+        so a failed batch is neither lost nor archived twice.
+        """
+        expired = self.expired_filter()
+        if expired is None:
+            return {'deleted': 0, 'batches': 0, 'archive': None}
+
+        archive_path = None
+        deleted = batches = 0
+        while True:
+            staged = None
+            try:
+                with transaction.atomic():
+                    rows = list(
+                        QueryHistory.objects.filter(expired).order_by('id').values()[:self.batch_size]
+                    )
+                    if not rows:
+                        break
+                    if self.archive_dir:
+                        staged = self._stage(rows)
+                    ids = [row['id'] for row in rows]
+                    batch_deleted = QueryHistory.objects.filter(id__in=ids).delete()[0]
+                deleted += batch_deleted
+                if staged is not None:
+                    archive_path = archive_path or self._archive_path()
+                    self._append(archive_path, staged)
+            finally:
+                if staged is not None and os.path.exists(staged):
+                    os.remove(staged)
+            batches += 1
+            # Give live requests room between batches
+            time.sleep(self.batch_pause)
+
+        if deleted:
+            logger.info("Purged %d query history rows in %d batches", deleted, batches)
+        return {'deleted': deleted, 'batches': batches, 'archive': archive_path}
+
+    def _archive_path(self) -> str:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        return os.path.join(self.archive_dir, f"query_history-{stamp}.jsonl.gz")
+
+    def _stage(self, rows: List[Dict[str, Any]]) -> str:
+        """Write a batch as one gzip member to a temp file next to the archives."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.archive_dir, prefix='.query_history-', suffix='.part')
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as archive:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n')
+        return path
+
+    @staticmethod
+    def _append(path: str, staged: str) -> None:
+        # Each batch is a separate gzip member; readers see one continuous JSONL stream
+        with open(staged, 'rb') as source, open(path, 'ab') as archive:
+            shutil.copyfileobj(source, archive)
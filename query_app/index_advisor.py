@@ -0,0 +1,227 @@
+"""
+Index advisor for slow generated queries.
+EXPLAINs slow history entries, spots full scans, sorts and unindexed joins, and ranks CREATE INDEX suggestions.
+"""
+import logging
+from datetime import timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from django.db.models import Avg, Count, Sum
+from django.utils import timezone
+from .admission import get_limiter
+from .database_inspector import DatabaseInspector, QueryExecutionError
+from .models import QueryHistory
+from .sql_validator import SQLValidator, SQLValidationError
+
+logger = logging.getLogger(__name__)
+
+JOIN_NODES = {'Hash Join', 'Merge Join', 'Nested Loop'}
+SORT_NODES = {'Sort', 'Incremental Sort'}
+FILTER_CLAUSES = ('WHERE',)
+JOIN_CLAUSES = ('ON', 'USING')
+MAX_INDEX_COLUMNS = 3
+
+
+class IndexAdvisor:
+    """Aggregate plan findings for slow queries of one target into ranked index suggestions."""
+
+    def __init__(self, database: str, inspector: DatabaseInspector, schema_info: Dict[str, Any],
+                 threshold: float, window: Optional[timedelta] = None, max_queries: int = 50,
+                 min_table_rows: int = 1000):
+        self.database = database
+        self.inspector = inspector
+        self.engine = schema_info['engine']
+        # The validator works in lowercase; keep the real names for estimates and DDL
+        self.table_names = {name.lower(): name for name in schema_info['tables']}
+        self.column_names = {
+            (table_name.lower(), column['name'].lower()): column['name']
+            for table_name, table_info in schema_info['tables'].items()
+            for column in table_info['columns']
+        }
+        self.row_estimates = {
+            name.lower(): rows for name, rows in schema_info.get('row_estimates', {}).items()
+        }
+        self.validator = SQLValidator(schema_info)
+        self.threshold = threshold
+        self.window = window
+        self.max_queries = max_queries
+        self.min_table_rows = min_table_rows
+
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """
+        Distinct successful queries whose execution time exceeded the threshold, costliest first.
+        Decomposed requests are skipped: their generated_sql is several statements joined together.
+        So are fallback answers, which were not written for the question.
+        """
+        queryset = QueryHistory.objects.filter(
+            database=self.database, success=True, execution_time__gte=self.threshold, fallback=''
+        ).exclude(generated_sql='').exclude(decomposed=True)
+        if self.window is not None:
+            queryset = queryset.filter(created_at__gte=timezone.now() - self.window)
+        return list(
+            queryset.order_by()
+            .values('generated_sql')
+            .annotate(
+                occurrences=Count('id'),
+                total_execution_time=Sum('execution_time'),
+                avg_execution_time=Avg('execution_time'),
+            )
+            .order_by('-total_execution_time')[:self.max_queries]
+        )
+
+    def advise(self) -> Dict[str, Any]:
+        slow_queries = self.slow_queries()
+        with get_limiter('db').slot():
+            existing_indexes = self.inspector.get_index_info()
+
+        suggestions: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        skipped = []
+        for entry in slow_queries:
+            sql = entry['generated_sql']
+            try:
+                # Only ever EXPLAIN statements that still pass read-only validation
+                sql = self.validator.validate(sql)
+                with get_limiter('db').slot():
+                    plan = self.inspector.explain_query(sql)
+            except (SQLValidationError, QueryExecutionError) as e:
+                skipped.append({'sql': sql, 'error': str(e)})
+                continue
+
+            references = self.validator.column_references(sql)
+            if self.engine == 'postgresql':
+                findings = self._postgresql_findings(plan, references)
+            else:
+                findings = self._mysql_findings(plan, references)
+
+            for table, columns, reason in findings:
+                # Only skip tables known to be small; an unknown estimate is not evidence of that
+                estimated_rows = self.row_estimates.get(table)
+                if estimated_rows is not None and estimated_rows < self.min_table_rows:
+                    continue
+                if self._is_covered(existing_indexes.get(table, []), columns):
+                    continue
+                suggestion = suggestions.setdefault((table, columns), {
+                    'table': self.table_names.get(table, table),
+                    'columns': [self.column_names.get((table, column), column) for column in columns],
+                    'statement': self._create_statement(table, columns),
+                    'reasons': set(),
+                    'occurrences': 0,
+                    'total_execution_time': 0.0,
+                    'queries': {},
+                })
+                suggestion['reasons'].add(reason)
+                if sql not in suggestion['queries']:
+                    suggestion['queries'][sql] = {
+                        'sql': sql,
+                        'occurrences': entry['occurrences'],
+                        'total_execution_time': entry['total_execution_time'],
+                        'avg_execution_time': entry['avg_execution_time'],
+                    }
+                    suggestion['occurrences'] += entry['occurrences']
+                    suggestion['total_execution_time'] += entry['total_execution_time']
+
+        self._fold_prefixes(suggestions)
+        ranked = sorted(suggestions.values(), key=lambda s: s['total_execution_time'], reverse=True)
+        for suggestion in ranked:
+            suggestion['reasons'] = sorted(suggestion['reasons'])
+            suggestion['queries'] = sorted(
+                suggestion['queries'].values(), key=lambda q: q['total_execution_time'], reverse=True
+            )
+        return {
+            'threshold': self.threshold,
+            'analyzed': len(slow_queries) - len(skipped),
+            'skipped': skipped,
+            'suggestions': ranked,
+        }
+
+    def _postgresql_findings(self, plan: Dict[str, Any], references: Dict[str, Any]) -> List[tuple]:
+        findings = []
+
+        def walk(node: Dict[str, Any], in_join: bool) -> None:
+            node_type = node.get('Node Type')
+            table = (node.get('Relation Name') or '').lower()
+            if node_type == 'Seq Scan' and table:
+                if 'Filter' in node:
+                    findings.extend(self._finding(references, table, FILTER_CLAUSES, 'sequential scan'))
+                if in_join:
+                    findings.extend(self._finding(references, table, JOIN_CLAUSES, 'missing join index'))
+            if node_type in SORT_NODES:
+                findings.extend(self._sort_findings(references, 'sort'))
+
+            child_in_join = node_type in JOIN_NODES or (in_join and node_type in ('Hash', 'Materialize'))
+            for child in node.get('Plans', []):
+                walk(child, child_in_join)
+
+        walk(plan, False)
+        return findings
+
+    def _mysql_findings(self, rows: List[Dict[str, Any]], references: Dict[str, Any]) -> List[tuple]:
+        findings = []
+        for position, row in enumerate(rows):
+            alias = (row.get('table') or '').lower()
+            table = references['aliases'].get(alias, alias)
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL' and 'Using where' in extra:
+                findings.extend(self._finding(references, table, FILTER_CLAUSES, 'full table scan'))
+            if 'Using join buffer' in extra or (row.get('type') == 'ALL' and position > 0):
+                findings.extend(self._finding(references, table, JOIN_CLAUSES, 'missing join index'))
+            if 'Using filesort' in extra:
+                findings.extend(self._sort_findings(references, 'filesort'))
+        return findings
+
+    def _finding(self, references: Dict[str, Any], table: str, clauses: tuple, reason: str) -> List[tuple]:
+        columns = self._columns(references, table, clauses)
+        return [(table, columns, reason)] if columns else []
+
+    def _sort_findings(self, references: Dict[str, Any], reason: str) -> List[tuple]:
+        """An index can only provide the order when every ORDER BY column is on one table."""
+        order_tables = {table for clause, table, _ in references['references'] if clause == 'ORDER BY'}
+        if len(order_tables) != 1:
+            return []
+        table = order_tables.pop()
+        columns = self._columns(references, table, FILTER_CLAUSES + ('ORDER BY',))
+        return [(table, columns, reason)] if columns else []
+
+    @staticmethod
+    def _columns(references: Dict[str, Any], table: str, clauses: tuple) -> Tuple[str, ...]:
+        """Columns of a table referenced in the given clauses, in clause then query order."""
+        columns: List[str] = []
+        for wanted in clauses:
+            for clause, ref_table, column in references['references']:
+                if clause == wanted and ref_table == table and column not in columns:
+                    columns.append(column)
+        return tuple(columns[:MAX_INDEX_COLUMNS])
+
+    @staticmethod
+    def _fold_prefixes(suggestions: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]) -> None:
+        """Merge a suggestion into a wider one on the same table whose columns start with it."""
+        for table, columns in sorted(suggestions, key=lambda key: len(key[1])):
+            wider = [
+                key for key in suggestions
+                if key[0] == table and len(key[1]) > len(columns) and key[1][:len(columns)] == columns
+            ]
+            if not wider:
+                continue
+            narrow = suggestions.pop((table, columns))
+            target = suggestions[wider[0]]
+            target['reasons'] |= narrow['reasons']
+            for sql, query in narrow['queries'].items():
+                if sql not in target['queries']:
+                    target['queries'][sql] = query
+                    target['occurrences'] += query['occurrences']
+                    target['total_execution_time'] += query['total_execution_time']
+
+    @staticmethod
+    def _is_covered(existing: List[List[str]], columns: Tuple[str, ...]) -> bool:
+        """Whether an existing index already starts with these columns."""
+        wanted = [column.lower() for column in columns]
+        return any([column.lower() for column in index[:len(wanted)]] == wanted for index in existing)
+
+    def _create_statement(self, table: str, columns: Tuple[str, ...]) -> str:
+        name = f"idx_{table}_{'_'.join(columns)}"[:63]
+        columns = tuple(self.column_names.get((table, column), column) for column in columns)
+        table = self.table_names.get(table, table)
+        if self.engine == 'postgresql':
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            return f'CREATE INDEX CONCURRENTLY "{name}" ON "{table}" ({column_list});'
+        column_list = ', '.join(f'`{column}`' for column in columns)
+        return f'CREATE INDEX `{name}` ON `{table}` ({column_list});'
@@ -0,0 +1,257 @@
+"""
+Tail-latency and failure controls for OpenAI calls.
+Hedged duplicate calls after the model's observed tail latency, a circuit
+breaker that fails fast while the provider is degraded, and a template answer
+for when no model answer can be had.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait
+from typing import Dict, Any, Callable, Optional
+from .admission import AdmissionRejected
+from .config import APIConfig, ServiceConfig
+from .model_router import LATENCY_SAMPLE_SIZE, ModelStats
+
+logger = logging.getLogger(__name__)
+
+COUNT_PATTERN = re.compile(r'\b(?:how many|count|number of)\b', re.IGNORECASE)
+WORD_PATTERN = re.compile(r'[a-z_][a-z0-9_]*')
+TEMPLATE_ROW_LIMIT = 100
+
+
+class LLMUnavailableError(Exception):
+    """The model could not answer: provider errors, timeouts or an open circuit."""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """The call timed out or the request deadline expired before the model answered."""
+
+
+class CircuitOpenError(AdmissionRejected, LLMUnavailableError):
+    """Fail-fast rejection while the OpenAI circuit breaker is open."""
+
+    def __init__(self, retry_after: int):
+        super().__init__('llm', retry_after, status_code=503,
+                         message=f"OpenAI is degraded, retry in {retry_after}s.")
+
+    def __reduce__(self):
+        return self.__class__, (self.retry_after,)
+
+
+class CircuitBreaker:
+    """
+    Closed until failure_threshold consecutive provider failures, then open
+    (fail fast) for reset_timeout seconds, then half-open: one probe call
+    decides whether to close again or re-open.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def before_call(self) -> None:
+        """Admit a call or raise CircuitOpenError."""
+        with self._lock:
+            if self._state == 'open':
+                remaining = self.reset_timeout - (time.time() - self._opened_at)
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpenError(max(1, math.ceil(remaining)))
+                self._state = 'half_open'
+                self._probing = False
+            if self._state == 'half_open':
+                if self._probing:
+                    self._rejected += 1
+                    raise CircuitOpenError(1)
+                self._probing = True
+
+    def record(self, success: Optional[bool]) -> None:
+        """
+        Record whether the provider answered; any HTTP answer counts as success.
+        None (the call never reached the provider) only ends a half-open probe.
+        """
+        with self._lock:
+            self._probing = False
+            if success is None:
+                return
+            if success:
+                self._state = 'closed'
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == 'half_open' or self._failures >= self.failure_threshold:
+                if self._state != 'open':
+                    logger.warning("OpenAI circuit breaker opened after %d failures", self._failures)
+                self._state = 'open'
+                self._opened_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'rejected': self._rejected,
+            }
+
+
+class Hedger:
+    """
+    Race a duplicate call against one that outlives the model's tail latency.
+    The tail is taken over single successful API calls, not ModelStats: whole
+    conversions include repairs and timeouts, which would push the hedge delay
+    up to the timeout just when hedging is needed.
+    """
+
+    def __init__(self, enabled: bool, percentile: float, min_delay: float, max_inflight: int):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self._budget = threading.BoundedSemaphore(max(1, max_inflight))
+        # Abandoned losers keep a worker until their own timeout, so leave headroom
+        workers = 2 * (ServiceConfig.get_admission_config()['LLM_MAX_CONCURRENCY'] + max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-hedge')
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency: float) -> None:
+        """Record the latency of one successful API call."""
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=LATENCY_SAMPLE_SIZE)).append(latency)
+
+    def delay(self, model: str) -> float:
+        """Hedge delay for a model: its call latency percentile (0.0 if no samples)."""
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        return ModelStats._percentile(samples, self.percentile)
+
+    def call(self, fn: Callable[[float], Any], model: str, timeout: float,
+             deadline: Optional[float] = None) -> Any:
+        """
+        Run fn(timeout). If it has not answered after the model's percentile
+        latency, send fn again and return whichever succeeds first; the loser
+        is cancelled if not yet started and otherwise left to time out.
+        Waiting never outlasts the deadline (default: timeout from now).
+        """
+        delay = self.delay(model)
+        if not self.enabled or delay <= 0:
+            return fn(timeout)
+        delay = max(delay, self.min_delay)
+        if delay >= timeout:
+            return fn(timeout)
+
+        start = time.time()
+        deadline = start + timeout if deadline is None else deadline
+        primary = self._executor.submit(fn, timeout)
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        # Never hedge beyond the in-flight budget, so hedging cannot amplify an overload
+        if not self._budget.acquire(blocking=False):
+            try:
+                return primary.result(timeout=max(0.0, deadline - time.time()))
+            except FuturesTimeout:
+                raise LLMTimeoutError(f"OpenAI did not answer within {time.time() - start:.1f}s") from None
+        hedge = self._executor.submit(fn, timeout - (time.time() - start))
+        hedge.add_done_callback(lambda _: self._budget.release())
+        with self._lock:
+            self._hedged += 1
+
+        pending = {primary, hedge}
+        errors = {}
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                raise LLMTimeoutError(f"OpenAI did not answer within {time.time() - start:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        with self._lock:
+                            self._hedge_wins += 1
+                    return future.result()
+                errors[future] = future.exception()
+        raise errors.get(primary) or errors[hedge]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = list(self._latencies)
+            stats = {'enabled': self.enabled, 'hedged': self._hedged, 'hedge_wins': self._hedge_wins}
+        stats['delays'] = {model: self.delay(model) for model in models}
+        return stats
+
+
+def template_sql(natural_query: str, schema_info: Dict[str, Any]) -> Optional[str]:
+    """
+    Last-resort SQL for simple questions naming exactly one table:
+    a COUNT(*) for "how many" questions, otherwise the first rows of the table.
+    """
+    words = set(WORD_PATTERN.findall(natural_query.lower()))
+    matches = [
+        name for name in schema_info['tables']
+        if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name)
+        # PostgreSQL folds unquoted names to lowercase
+        and (schema_info['engine'] != 'postgresql' or name == name.lower())
+        and words & {name.lower(), f"{name.lower()}s", name.lower().rstrip('s')}
+    ]
+    if len(matches) != 1:
+        return None
+    if COUNT_PATTERN.search(natural_query):
+        return f"SELECT COUNT(*) AS count FROM {matches[0]}"
+    return f"SELECT * FROM {matches[0]} LIMIT {TEMPLATE_ROW_LIMIT}"
+
+
+_breaker = None
+_hedger = None
+_resilience_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get the process-wide OpenAI circuit breaker (lazy loading)."""
+    global _breaker
+    with _resilience_lock:
+        if _breaker is None:
+            config = APIConfig.get_llm_client_config()
+            _breaker = CircuitBreaker(config['BREAKER_FAILURE_THRESHOLD'], config['BREAKER_RESET_TIMEOUT'])
+        return _breaker
+
+
+def get_hedger() -> Hedger:
+    """Get the process-wide request hedger (lazy loading)."""
+    global _hedger
+    with _resilience_lock:
+        if _hedger is None:
+            config = APIConfig.get_llm_client_config()
+            _hedger = Hedger(
+                enabled=config['HEDGE_ENABLED'],
+                percentile=config['HEDGE_PERCENTILE'],
+                min_delay=config['HEDGE_MIN_DELAY'],
+                max_inflight=config['HEDGE_MAX_INFLIGHT'],
+            )
+        return _hedger
+
+
+def get_llm_resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Circuit breaker state and hedging counters."""
+    return {'circuit_breaker': get_circuit_breaker().stats(), 'hedging': get_hedger().stats()}
@@ -0,0 +1,48 @@
+"""
+Enforce the query history retention policy.
+Run once (e.g. from cron) or with --loop as a long-running background job.
+"""
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from query_app.config import ServiceConfig
+from query_app.history_retention import HistoryRetention
+
+
+class Command(BaseCommand):
+    help = "Archive and delete query history beyond the configured age and row limits."
+
+    def add_arguments(self, parser):
+        config = ServiceConfig.get_history_retention_config()
+        parser.add_argument('--max-age-days', type=int, default=config['MAX_AGE_DAYS'],
+                            help="Delete rows older than this many days (0 disables)")
+        parser.add_argument('--max-rows', type=int, default=config['MAX_ROWS'],
+                            help="Keep at most this many newest rows (0 disables)")
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'],
+                            help="Rows archived and deleted per transaction")
+        parser.add_argument('--batch-pause', type=float, default=config['BATCH_PAUSE'],
+                            help="Seconds to sleep between batches")
+        parser.add_argument('--archive-dir', default=config['ARCHIVE_DIR'],
+                            help="Directory for gzip JSONL archives of purged rows")
+        parser.add_argument('--no-archive', action='store_true', help="Delete without archiving")
+        parser.add_argument('--loop', action='store_true', help="Keep running and purge every --interval seconds")
+        parser.add_argument('--interval', type=float, default=config['INTERVAL'],
+                            help="Seconds between purges in --loop mode")
+
+    def handle(self, *args, **options):
+        retention = HistoryRetention(
+            max_age=timedelta(days=options['max_age_days']) if options['max_age_days'] > 0 else None,
+            max_rows=options['max_rows'] if options['max_rows'] > 0 else None,
+            batch_size=options['batch_size'],
+            batch_pause=options['batch_pause'],
+            archive_dir='' if options['no_archive'] else options['archive_dir'],
+        )
+        while True:
+            outcome = retention.purge()
+            message = f"Purged {outcome['deleted']} rows in {outcome['batches']} batches"
+            if outcome['archive']:
+                message += f", archived to {outcome['archive']}"
+            self.stdout.write(message)
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,93 @@
+"""
+Warm the translation and result caches with the most frequent questions.
+Run once (e.g. from cron) or with --loop as a long-running off-peak scheduler.
+"""
+import time
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from query_app.analytics import parse_window
+from query_app.cache_warmer import CacheWarmer, in_off_peak, parse_clock
+from query_app.config import DatabaseConfig, ServiceConfig
+
+# Backends whose entries only this process can see
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+class Command(BaseCommand):
+    help = "Pre-run the hottest historical questions to fill the translation and result caches."
+
+    def add_arguments(self, parser):
+        config = ServiceConfig.get_cache_warming_config()
+        parser.add_argument('--database', action='append', dest='databases',
+                            help="Target database to warm (repeatable; default: all configured targets)")
+        parser.add_argument('--top', type=int, default=config['TOP_QUESTIONS'],
+                            help="Number of questions to warm per target")
+        parser.add_argument('--window', default=config['HISTORY_WINDOW'],
+                            help="History window to rank questions over, e.g. 24h or 7d")
+        parser.add_argument('--concurrency', type=int, default=config['CONCURRENCY'],
+                            help="Maximum questions warmed at once")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running and warm every --interval seconds inside the off-peak window")
+        parser.add_argument('--interval', type=float, default=config['INTERVAL'],
+                            help="Seconds between warming runs in --loop mode")
+        parser.add_argument('--off-peak-start', default=config['OFF_PEAK_START'], help="Local time HH:MM")
+        parser.add_argument('--off-peak-end', default=config['OFF_PEAK_END'], help="Local time HH:MM")
+        parser.add_argument('--allow-local-cache', action='store_true',
+                            help="Warm even if the cache backend is per-process (only useful for testing)")
+
+    def handle(self, *args, **options):
+        try:
+            window = parse_window(options['window'])
+            start = parse_clock(options['off_peak_start'])
+            end = parse_clock(options['off_peak_end'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.check_cache(options['allow_local_cache'], options['loop'], options['interval'])
+
+        databases = options['databases'] or DatabaseConfig.get_target_names()
+        unknown = set(databases) - set(DatabaseConfig.get_target_names())
+        if unknown:
+            raise CommandError(f"Unknown target database(s): {', '.join(sorted(unknown))}")
+
+        if not options['loop']:
+            self.warm(databases, options['top'], window, options['concurrency'])
+            return
+
+        self.stdout.write(f"Warming {', '.join(databases)} between {start:%H:%M} and {end:%H:%M}")
+        last_run = None
+        while True:
+            now = time.time()
+            if in_off_peak(timezone.now(), start, end) and (last_run is None or now - last_run >= options['interval']):
+                last_run = now
+                self.warm(databases, options['top'], window, options['concurrency'])
+            time.sleep(min(60, options['interval']))
+
+    def check_cache(self, allow_local_cache, loop, interval):
+        """Refuse to warm a cache no server worker can read, and flag results that expire between runs."""
+        cache_config = ServiceConfig.get_query_cache_config()
+        if not cache_config['ENABLED']:
+            raise CommandError("The query cache is disabled (QUERY_CACHE_ENABLED), nothing to warm")
+        backend = caches[cache_config['CACHE_ALIAS']]
+        if isinstance(backend, PER_PROCESS_CACHES):
+            message = (f"Cache '{cache_config['CACHE_ALIAS']}' uses {type(backend).__name__}, which is per-process: "
+                       f"server workers will not see warmed entries. Configure a shared CACHE_BACKEND.")
+            if not allow_local_cache:
+                raise CommandError(message)
+            self.stderr.write(f"Warning: {message}")
+        result_ttl = ServiceConfig.get_cache_warming_config()['RESULT_TTL']
+        if loop and interval > result_ttl:
+            self.stderr.write(f"Warning: --interval {interval:g}s exceeds the warmed result TTL "
+                              f"({result_ttl:g}s), so warmed results expire between runs")
+
+    def warm(self, databases, top, window, concurrency):
+        for database in databases:
+            outcomes = CacheWarmer(database, top=top, window=window, concurrency=concurrency).warm()
+            warmed = sum(1 for outcome in outcomes if outcome['status'] == 'warmed')
+            self.stdout.write(f"[{database}] warmed {warmed}/{len(outcomes)} questions")
+            for outcome in outcomes:
+                if outcome['status'] != 'warmed':
+                    self.stderr.write(f"  {outcome['status']}: {outcome['question']} ({outcome['error']})")
@@ -0,0 +1,57 @@
+"""
+Response compression middleware.
+Django's GZipMiddleware, with brotli when the optional brotli package is installed and accepted.
+"""
+import re
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+ACCEPTS_BROTLI = re.compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses of at least RESPONSE_COMPRESSION_MIN_SIZE bytes.
+    Gzip keeps Django's BREACH mitigation (random padding). Brotli has none, so
+    a response whose body may hold the CSRF token or session data gets gzip.
+    Strong ETags are weakened for either encoding, as GZipMiddleware does.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (brotli is None or response.streaming or not ACCEPTS_BROTLI.search(accept_encoding)
+                or self.may_hold_secrets(request, response)):
+            return super().process_response(request, response)
+
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def may_hold_secrets(request, response) -> bool:
+        """Whether the body may echo the CSRF token or the session the response carries."""
+        if request.META.get('CSRF_COOKIE_USED'):
+            return True
+        return any(name in response.cookies for name in (settings.CSRF_COOKIE_NAME, settings.SESSION_COOKIE_NAME))
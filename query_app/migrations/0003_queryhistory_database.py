@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_app', '0002_alter_queryhistory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queryhistory',
+            name='database',
+            field=models.CharField(default='default', max_length=100),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_app', '0003_queryhistory_database'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queryhistory',
+            name='cached_tokens',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='completion_tokens',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='llm_latency',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='model_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='prompt_tokens',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='result_bytes',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='row_count',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='total_latency',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='queryhistory',
+            index=models.Index(fields=['created_at'], name='query_app_q_created_267d8a_idx'),
+        ),
+    ]
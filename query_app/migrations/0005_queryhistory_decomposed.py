@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_app', '0004_queryhistory_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queryhistory',
+            name='decomposed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
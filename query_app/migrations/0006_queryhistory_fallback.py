@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_app', '0005_queryhistory_decomposed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queryhistory',
+            name='fallback',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
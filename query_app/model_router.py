@@ -0,0 +1,125 @@
+"""
+Model routing for NL-to-SQL conversion.
+Sends simple questions to a fast model and escalates to the strong model on failure.
+"""
+import re
+import threading
+from collections import deque
+from typing import Dict, Any, List
+
+COMPLEX_TERMS = {
+    'compare', 'versus', 'vs', 'ratio', 'percent', 'percentage', 'rank', 'ranking',
+    'trend', 'cumulative', 'running', 'median', 'percentile', 'growth', 'cohort',
+    'retention', 'except', 'without', 'never', 'each', 'per',
+}
+
+LATENCY_SAMPLE_SIZE = 200
+
+
+class ModelStats:
+    """Process-wide per-model latency and success counters."""
+
+    _stats: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, model: str, latency: float, success: bool) -> None:
+        """Record the outcome of one conversion attempt."""
+        with cls._lock:
+            entry = cls._stats.setdefault(model, {
+                'calls': 0,
+                'successes': 0,
+                'failures': 0,
+                'latencies': deque(maxlen=LATENCY_SAMPLE_SIZE),
+            })
+            entry['calls'] += 1
+            entry['successes' if success else 'failures'] += 1
+            entry['latencies'].append(latency)
+
+    @classmethod
+    def percentile(cls, model: str, percentile: float) -> float:
+        """Latency percentile over the recent samples for a model (0.0 if none)."""
+        with cls._lock:
+            entry = cls._stats.get(model)
+            samples = sorted(entry['latencies']) if entry else []
+        return cls._percentile(samples, percentile)
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Dict[str, Any]]:
+        """Return a JSON-serializable view of the current stats."""
+        with cls._lock:
+            entries = {model: (dict(entry), sorted(entry['latencies'])) for model, entry in cls._stats.items()}
+
+        snapshot = {}
+        for model, (entry, samples) in entries.items():
+            snapshot[model] = {
+                'calls': entry['calls'],
+                'successes': entry['successes'],
+                'failures': entry['failures'],
+                'success_rate': entry['successes'] / entry['calls'] if entry['calls'] else None,
+                'avg_latency': sum(samples) / len(samples) if samples else None,
+                'p50_latency': cls._percentile(samples, 50) if samples else None,
+                'p95_latency': cls._percentile(samples, 95) if samples else None,
+            }
+        return snapshot
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._stats.clear()
+
+    @staticmethod
+    def _percentile(samples: List[float], percentile: float) -> float:
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class ModelRouter:
+    """Pick the model tiers to try for a question, in escalation order."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+    def extract_features(self, natural_query: str, schema_info: Dict[str, Any]) -> Dict[str, int]:
+        """Compute the routing features for a question against a schema."""
+        words = re.findall(r'[a-z0-9_]+', natural_query.lower())
+        text = ' '.join(words)
+
+        touched_tables = 0
+        for table_name in schema_info.get('tables', {}):
+            name = table_name.lower()
+            candidates = {name, name.replace('_', ' ')}
+            candidates.update(c[:-1] for c in list(candidates) if c.endswith('s') and len(c) > 3)
+            if any(re.search(r'\b%s\b' % re.escape(c), text) for c in candidates):
+                touched_tables += 1
+
+        return {
+            'schema_tables': len(schema_info.get('tables', {})),
+            'question_words': len(words),
+            'touched_tables': touched_tables,
+            'complex_terms': sum(1 for word in words if word in COMPLEX_TERMS),
+        }
+
+    def is_simple(self, features: Dict[str, int]) -> bool:
+        """Whether a question is cheap enough to try on the fast model first."""
+        return (
+            features['schema_tables'] <= self.config['MAX_SCHEMA_TABLES']
+            and features['question_words'] <= self.config['MAX_QUESTION_WORDS']
+            and features['touched_tables'] <= self.config['MAX_TOUCHED_TABLES']
+            and features['complex_terms'] == 0
+        )
+
+    def route(self, natural_query: str, schema_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Return the model tiers to try, in order.
+        Each tier is a dict with 'model' and 'max_tokens'.
+        """
+        strong = {'model': self.config['STRONG_MODEL'], 'max_tokens': self.config['STRONG_MAX_TOKENS']}
+        fast = {'model': self.config['FAST_MODEL'], 'max_tokens': self.config['FAST_MAX_TOKENS']}
+
+        features = self.extract_features(natural_query, schema_info)
+        if self.is_simple(features) and fast['model'] != strong['model']:
+            return [fast, strong]
+        return [strong]
@@ -2,6 +2,7 @@ from django.db import models
 
 class QueryHistory(models.Model):
     """Simplified query history model without user/connection dependencies."""
+    database = models.CharField(max_length=100, default='default')
     natural_query = models.TextField()
     generated_sql = models.TextField()
     execution_time = models.FloatField(null=True)
@@ -9,7 +10,22 @@ class QueryHistory(models.Model):
     error_message = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Per-stage performance measurements
+    total_latency = models.FloatField(null=True)
+    llm_latency = models.FloatField(null=True)
+    model_name = models.CharField(max_length=100, blank=True)
+    prompt_tokens = models.IntegerField(null=True)
+    completion_tokens = models.IntegerField(null=True)
+    cached_tokens = models.IntegerField(null=True)
+    row_count = models.IntegerField(null=True)
+    result_bytes = models.IntegerField(null=True)
+    # Compound question run as parallel sub-queries; generated_sql holds all of them
+    decomposed = models.BooleanField(default=False)
+    # 'history' or 'template' when the model was unavailable and a fallback answered
+    fallback = models.CharField(max_length=20, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'])]
         verbose_name = 'Query History'
         verbose_name_plural = 'Query Histories'
\ No newline at end of file
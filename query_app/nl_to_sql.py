@@ -1,66 +1,290 @@
 import openai
 import json
-from typing import Dict, Any
+import logging
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+from .admission import AdmissionRejected, get_limiter
+from .config import APIConfig, ServiceConfig
+from .database_inspector import schema_fingerprint
+from .llm_resilience import LLMTimeoutError, LLMUnavailableError, get_circuit_breaker, get_hedger
+from .sql_validator import SQLValidator
 
-class NLToSQLConverter:
-    def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
-    
-    def convert_to_sql(self, natural_query: str, schema_info: Dict[str, Any]) -> str:
-        schema_description = self._format_schema_for_prompt(schema_info)
-        
-        prompt = f"""
-You are a SQL expert. Convert the following natural language query to SQL based on the provided database schema.
-
-Database Schema:
-{schema_description}
+logger = logging.getLogger(__name__)
 
-Natural Language Query: {natural_query}
+# The system message holds everything that only depends on the schema so the
+# provider can reuse its cached prefix; the question is always sent last.
+SYSTEM_PROMPT_TEMPLATE = """You are a SQL expert that converts natural language to SQL queries.
 
 Rules:
-1. Generate only valid SQL for {schema_info['engine']}
+1. Generate only valid SQL for {engine}
 2. Use proper table and column names from the schema
 3. Include appropriate JOINs when querying multiple tables
 4. Use LIMIT for potentially large result sets
 5. Return only the SQL query, no explanations
 
-SQL Query:"""
+Database Schema:
+{schema_description}"""
+
+# Sent as the user turn after the usual system prompt, so the cached schema prefix is reused
+DECOMPOSE_PROMPT_TEMPLATE = """Question: {question}
+
+Split this question into at most {max_parts} independent questions that can each be answered \
+by one simple SQL query without using another query's results. If it cannot be split, \
+return it unchanged as the only element.
+
+Return only JSON: {{"sub_questions": ["...", "..."]}}"""
+
+CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+
+SCHEMA_PROMPT_CACHE_SIZE = 32
+
+
+class SchemaPromptCache:
+    """Process-wide LRU of formatted system prompts keyed by schema fingerprint."""
+
+    _entries: "OrderedDict[str, str]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, fingerprint: str) -> Optional[str]:
+        with cls._lock:
+            prompt = cls._entries.get(fingerprint)
+            if prompt is not None:
+                cls._entries.move_to_end(fingerprint)
+            return prompt
+
+    @classmethod
+    def put(cls, fingerprint: str, prompt: str) -> None:
+        with cls._lock:
+            cls._entries[fingerprint] = prompt
+            cls._entries.move_to_end(fingerprint)
+            while len(cls._entries) > SCHEMA_PROMPT_CACHE_SIZE:
+                cls._entries.popitem(last=False)
 
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a SQL expert that converts natural language to SQL queries."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.1
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+
+
+class NLToSQLConverter:
+    def __init__(self, api_key: str, deadline: Optional[float] = None):
+        config = APIConfig.get_llm_client_config()
+        # Rate limits are retried by _complete with jittered backoff instead
+        self.client = openai.OpenAI(
+            api_key=api_key, base_url=config['BASE_URL'], timeout=config['TIMEOUT'], max_retries=0
         )
+        self.timeout = config['TIMEOUT']
+        # Wall-clock time by which every model call of this request must finish
+        self.deadline = deadline
+        self.last_usage: Dict[str, Any] = {}
+        self.total_usage: Dict[str, Any] = {
+            'calls': 0, 'latency': 0.0, 'prompt_tokens': 0,
+            'completion_tokens': 0, 'total_tokens': 0, 'cached_tokens': 0,
+        }
+    
+    def convert_to_sql(self, natural_query: str, schema_info: Dict[str, Any],
+                       model: str = "gpt-4", max_tokens: int = 500) -> str:
+        messages = self._build_messages(natural_query, schema_info)
+        return SQLValidator.clean(self._complete(messages, model, max_tokens))
+
+    def repair_sql(self, natural_query: str, schema_info: Dict[str, Any], sql_query: str,
+                   error: str, model: str = "gpt-4", max_tokens: int = 500) -> str:
+        """Ask the model to fix a query, feeding back the exact validation error."""
+        messages = self._build_messages(natural_query, schema_info)
+        messages.append({"role": "assistant", "content": sql_query})
+        messages.append({
+            "role": "user",
+            "content": f"That query is invalid: {error}\n\nReturn only the corrected SQL query."
+        })
+        return SQLValidator.clean(self._complete(messages, model, max_tokens))
+
+    def decompose_question(self, natural_query: str, schema_info: Dict[str, Any], max_parts: int = 4,
+                           model: str = "gpt-4", max_tokens: int = 300) -> List[str]:
+        """
+        Split a compound question into independent sub-questions.
+        Falls back to the original question when the reply is not usable JSON.
+        """
+        messages = [
+            {"role": "system", "content": self.get_system_prompt(schema_info)},
+            {"role": "user", "content": DECOMPOSE_PROMPT_TEMPLATE.format(
+                question=natural_query, max_parts=max_parts
+            )},
+        ]
+        content = self._complete(messages, model, max_tokens)
+        return self._parse_sub_questions(content, max_parts) or [natural_query]
+
+    def _build_messages(self, natural_query: str, schema_info: Dict[str, Any]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.get_system_prompt(schema_info)},
+            {"role": "user", "content": f"Natural Language Query: {natural_query}\n\nSQL Query:"}
+        ]
+
+    def _complete(self, messages: List[Dict[str, str]], model: str, max_tokens: int) -> str:
+        config = ServiceConfig.get_admission_config()
+        hedger = get_hedger()
         
-        sql_query = response.choices[0].message.content.strip()
+        def create(call_timeout: float):
+            call_start = time.time()
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.1,
+                timeout=call_timeout
+            )
+            # Answered calls alone set the hedge delay
+            hedger.record(model, time.time() - call_start)
+            return response
         
-        # Clean up the response
-        if sql_query.startswith('```sql'):
-            sql_query = sql_query[6:]
-        if sql_query.endswith('```'):
-            sql_query = sql_query[:-3]
+        start_time = time.time()
+        for retry in range(config['RATE_LIMIT_RETRIES'] + 1):
+            try:
+                with get_limiter('llm').slot():
+                    response = self._attempt(create, model)
+                break
+            except openai.RateLimitError as e:
+                retry_after = self._retry_after_header(e)
+                # Full jitter keeps workers from retrying in lockstep
+                backoff = min(config['RATE_LIMIT_MAX_BACKOFF'], config['RATE_LIMIT_BACKOFF'] * 2 ** retry)
+                delay = max(retry_after or 0, random.uniform(0, backoff))
+                if retry == config['RATE_LIMIT_RETRIES'] or self._past_deadline(delay):
+                    raise AdmissionRejected(
+                        'llm', retry_after or 1, status_code=429,
+                        message="OpenAI rate limit exceeded, please retry shortly."
+                    ) from e
+                # Back off outside the LLM slot so the wait doesn't hold concurrency from other requests
+                logger.warning("OpenAI rate limited, retrying in %.2fs", delay)
+                time.sleep(delay)
+        self.last_usage = self._extract_usage(response, time.time() - start_time)
+        logger.info("LLM usage: %s", json.dumps(self.last_usage))
+        self._accumulate_usage(self.last_usage)
         
-        return sql_query.strip()
+        return response.choices[0].message.content or ''
+
+    def _attempt(self, create, model: str):
+        """One (possibly hedged) call, with its outcome recorded by the circuit breaker."""
+        # A deadline spent before the call (queueing, the database, repairs) is not the provider's fault
+        timeout = self._call_timeout()
+        breaker = get_circuit_breaker()
+        breaker.before_call()
+        answered = None
+        try:
+            response = get_hedger().call(create, model, timeout, deadline=self.deadline)
+            answered = True
+            return response
+        except openai.APITimeoutError as e:
+            answered = False
+            raise LLMTimeoutError(f"OpenAI did not answer within {timeout:.1f}s") from e
+        except LLMTimeoutError:
+            # The hedger ran out of deadline with a call in flight
+            answered = False
+            raise
+        except (openai.APIConnectionError, openai.InternalServerError) as e:
+            answered = False
+            raise LLMUnavailableError(f"OpenAI request failed: {e}") from e
+        except openai.APIStatusError:
+            # Includes rate limiting: the provider answered
+            answered = True
+            raise
+        finally:
+            breaker.record(answered)
+
+    def _call_timeout(self) -> float:
+        """Per-call timeout: the client timeout, cut short by the request deadline."""
+        if self.deadline is None:
+            return self.timeout
+        remaining = self.deadline - time.time()
+        if remaining <= 0:
+            raise LLMTimeoutError("Request deadline exceeded before the model was called")
+        return min(self.timeout, remaining)
+
+    def _past_deadline(self, delay: float) -> bool:
+        return self.deadline is not None and time.time() + delay >= self.deadline
+
+    def get_system_prompt(self, schema_info: Dict[str, Any]) -> str:
+        """Return the byte-stable system prompt for a schema, memoized per fingerprint."""
+        fingerprint = schema_info.get('fingerprint') or schema_fingerprint(schema_info)
+        system_prompt = SchemaPromptCache.get(fingerprint)
+        if system_prompt is None:
+            system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+                engine=schema_info['engine'],
+                schema_description=self._format_schema_for_prompt(schema_info),
+            )
+            SchemaPromptCache.put(fingerprint, system_prompt)
+        return system_prompt
     
     def _format_schema_for_prompt(self, schema_info: Dict[str, Any]) -> str:
-        schema_text = f"Database Engine: {schema_info['engine']}\n\nTables:\n"
+        lines = [f"Database Engine: {schema_info['engine']}", "", "Tables:"]
         
-        for table_name, table_info in schema_info['tables'].items():
-            schema_text += f"\n{table_name}:\n"
+        # Sorted so the same schema always renders to the same bytes
+        for table_name in sorted(schema_info['tables']):
+            table_info = schema_info['tables'][table_name]
+            lines.append("")
+            lines.append(f"{table_name}:")
             
             # Add columns
             for column in table_info['columns']:
                 nullable = "NULL" if column['nullable'] else "NOT NULL"
-                schema_text += f"  - {column['name']} ({column['type']}) {nullable}\n"
+                lines.append(f"  - {column['name']} ({column['type']}) {nullable}")
             
             # Add relationships
             if table_info['relationships']:
-                schema_text += "  Foreign Keys:\n"
-                for rel in table_info['relationships']:
-                    schema_text += f"    - {rel['column']} -> {rel['references_table']}.{rel['references_column']}\n"
+                lines.append("  Foreign Keys:")
+                relationships = sorted(
+                    table_info['relationships'],
+                    key=lambda rel: (rel['column'], rel['references_table'], rel['references_column'])
+                )
+                for rel in relationships:
+                    lines.append(f"    - {rel['column']} -> {rel['references_table']}.{rel['references_column']}")
         
-        return schema_text
\ No newline at end of file
+        return "\n".join(lines) + "\n"
+
+    def _accumulate_usage(self, usage: Dict[str, Any]) -> None:
+        """Add one call's usage to the totals for this converter's lifetime (one request)."""
+        self.total_usage['calls'] += 1
+        for key in ('latency', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'cached_tokens'):
+            self.total_usage[key] += usage.get(key) or 0
+
+    @staticmethod
+    def _parse_sub_questions(content: str, max_parts: int) -> List[str]:
+        """Read {"sub_questions": [...]} (or a bare list), tolerating code fences around it."""
+        text = CODE_FENCE_PATTERN.sub('', content.strip())
+        try:
+            parsed = json.loads(text)
+        except ValueError:
+            logger.warning("Could not parse question decomposition: %r", content)
+            return []
+        if isinstance(parsed, dict):
+            parsed = parsed.get('sub_questions')
+        if not isinstance(parsed, list):
+            return []
+        questions = [q.strip() for q in parsed if isinstance(q, str) and q.strip()]
+        return questions[:max_parts]
+
+    @staticmethod
+    def _retry_after_header(error: Exception) -> Optional[int]:
+        response = getattr(error, 'response', None)
+        value = response.headers.get('retry-after') if response is not None else None
+        try:
+            return max(1, int(float(value))) if value else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _extract_usage(response, latency: float) -> Dict[str, Any]:
+        """Collect token counts, including provider-side cached prompt tokens."""
+        usage = getattr(response, 'usage', None)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            'model': getattr(response, 'model', None),
+            'latency': latency,
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None),
+            'total_tokens': getattr(usage, 'total_tokens', None),
+            'cached_tokens': getattr(details, 'cached_tokens', None) or 0,
+        }
@@ -0,0 +1,97 @@
+"""
+Translation and result caches for natural language queries.
+Entries live in the Django cache framework, so warming from a separate process
+only helps when CACHES points at a backend shared by all workers.
+"""
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional
+from django.core.cache import caches
+from .coalescing import normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    Question -> validated SQL, and SQL -> execution result, per target and schema
+    fingerprint. A schema change yields new keys, so stale entries simply age out.
+    """
+
+    def __init__(self, alias: str = 'default', translation_ttl: float = 86400,
+                 result_ttl: float = 300, max_result_bytes: int = 1048576):
+        self.alias = alias
+        self.translation_ttl = translation_ttl
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _key(kind: str, *parts: str) -> str:
+        digest = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+        return f"query_app:{kind}:{digest}"
+
+    def translation_key(self, database: str, natural_query: str, fingerprint: str) -> str:
+        return self._key('sql', database, normalize_question(natural_query), fingerprint)
+
+    def result_key(self, database: str, sql_query: str, fingerprint: str) -> str:
+        return self._key('result', database, sql_query, fingerprint)
+
+    def get_translation(self, database: str, natural_query: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Cached {'sql', 'model'} for a question, or None."""
+        return self._get(self.translation_key(database, natural_query, fingerprint))
+
+    def set_translation(self, database: str, natural_query: str, fingerprint: str,
+                        sql_query: str, model: str) -> None:
+        self._set(self.translation_key(database, natural_query, fingerprint),
+                  {'sql': sql_query, 'model': model}, self.translation_ttl)
+
+    def delete_translation(self, database: str, natural_query: str, fingerprint: str) -> None:
+        try:
+            self.cache.delete(self.translation_key(database, natural_query, fingerprint))
+        except Exception as e:
+            logger.warning("Query cache delete failed: %s", e)
+
+    def decomposition_key(self, database: str, natural_query: str, fingerprint: str) -> str:
+        return self._key('decompose', database, normalize_question(natural_query), fingerprint)
+
+    def get_decomposition(self, database: str, natural_query: str, fingerprint: str) -> Optional[List[str]]:
+        """Cached sub-questions for a compound question, or None."""
+        return self._get(self.decomposition_key(database, natural_query, fingerprint))
+
+    def set_decomposition(self, database: str, natural_query: str, fingerprint: str,
+                          sub_questions: List[str]) -> None:
+        self._set(self.decomposition_key(database, natural_query, fingerprint),
+                  sub_questions, self.translation_ttl)
+
+    def get_result(self, database: str, sql_query: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Cached {'query_result', 'execution_time', 'result_bytes'} for a statement, or None."""
+        return self._get(self.result_key(database, sql_query, fingerprint))
+
+    def set_result(self, database: str, sql_query: str, fingerprint: str, query_result: Dict[str, Any],
+                   execution_time: float, result_bytes: int, ttl: Optional[float] = None) -> None:
+        """Cache an execution result unless it is larger than max_result_bytes."""
+        if result_bytes > self.max_result_bytes:
+            return
+        self._set(self.result_key(database, sql_query, fingerprint), {
+            'query_result': query_result,
+            'execution_time': execution_time,
+            'result_bytes': result_bytes,
+        }, self.result_ttl if ttl is None else ttl)
+
+    def _get(self, key: str) -> Optional[Any]:
+        # A cache outage degrades to a miss rather than failing the query
+        try:
+            return self.cache.get(key)
+        except Exception as e:
+            logger.warning("Query cache read failed: %s", e)
+            return None
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            self.cache.set(key, value, ttl)
+        except Exception as e:
+            logger.warning("Query cache write failed: %s", e)
@@ -0,0 +1,93 @@
+"""
+In-memory index over a schema snapshot.
+Serves table lists, per-table detail and name search without re-sending the whole schema.
+"""
+import bisect
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class SchemaIndex:
+    """Lookup structures built once per schema snapshot."""
+
+    def __init__(self, schema_info: Dict[str, Any]):
+        self.schema_info = schema_info
+        tables = schema_info.get('tables', {})
+        row_estimates = schema_info.get('row_estimates', {})
+
+        self._tables_by_name: Dict[str, str] = {name.lower(): name for name in tables}
+        self._summaries: List[Dict[str, Any]] = [
+            {
+                'name': name,
+                'column_count': len(tables[name]['columns']),
+                'estimated_rows': row_estimates.get(name),
+            }
+            for name in sorted(tables, key=str.lower)
+        ]
+        self._summary_by_name = {summary['name']: summary for summary in self._summaries}
+
+        # Sorted lowercase keys for bisect prefix search; substring search scans the same keys
+        self._table_keys: List[Tuple[str, str]] = sorted((name.lower(), name) for name in tables)
+        self._column_keys: List[Tuple[str, str, Dict[str, Any]]] = sorted(
+            ((column['name'].lower(), table_name, column)
+             for table_name, table_info in tables.items()
+             for column in table_info['columns']),
+            key=lambda entry: (entry[0], entry[1].lower())
+        )
+
+        self._referenced_by: Dict[str, List[Dict[str, str]]] = {}
+        for table_name, table_info in tables.items():
+            for rel in table_info['relationships']:
+                self._referenced_by.setdefault(rel['references_table'], []).append({
+                    'table': table_name,
+                    'column': rel['column'],
+                    'references_column': rel['references_column'],
+                })
+
+    @property
+    def table_count(self) -> int:
+        return len(self._summaries)
+
+    def list_tables(self, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Lightweight table summaries (name, column count, estimated rows), paginated."""
+        return self._summaries[offset:offset + limit]
+
+    def get_table(self, name: str) -> Optional[Dict[str, Any]]:
+        """Full detail for one table (case-insensitive), or None if it does not exist."""
+        table_name = self._tables_by_name.get(name.lower())
+        if table_name is None:
+            return None
+        table_info = self.schema_info['tables'][table_name]
+        return {
+            'name': table_name,
+            'estimated_rows': self._summary_by_name[table_name]['estimated_rows'],
+            'columns': table_info['columns'],
+            'relationships': table_info['relationships'],
+            'referenced_by': self._referenced_by.get(table_name, []),
+        }
+
+    def search(self, query: str, mode: str = 'substring', limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """Search table and column names by prefix or substring (case-insensitive)."""
+        needle = query.lower()
+        if mode == 'prefix':
+            tables = self._prefix_matches(self._table_keys, needle, limit)
+            columns = self._prefix_matches(self._column_keys, needle, limit)
+        else:
+            tables = [entry for entry in self._table_keys if needle in entry[0]][:limit]
+            columns = [entry for entry in self._column_keys if needle in entry[0]][:limit]
+
+        return {
+            'tables': [self._summary_by_name[name] for _, name in tables],
+            'columns': [
+                {'table': table_name, 'name': column['name'], 'type': column['type']}
+                for _, table_name, column in columns
+            ],
+        }
+
+    @staticmethod
+    def _prefix_matches(keys: List[tuple], prefix: str, limit: int) -> List[tuple]:
+        matches = []
+        for position in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+            if len(matches) >= limit or not keys[position][0].startswith(prefix):
+                break
+            matches.append(keys[position])
+        return matches
@@ -1,9 +1,17 @@
 from rest_framework import serializers
 from .models import QueryHistory
+from .config import DatabaseConfig
 
 class QueryRequestSerializer(serializers.Serializer):
     """Simplified query request serializer - only natural query needed."""
     natural_query = serializers.CharField(max_length=1000)
+    database = serializers.CharField(max_length=100, required=False, default='default')
+    decompose = serializers.BooleanField(required=False, default=False)
+
+    def validate_database(self, value):
+        if value not in DatabaseConfig.get_target_names():
+            raise serializers.ValidationError(f"Unknown target database: {value}")
+        return value
 
 class QueryResponseSerializer(serializers.Serializer):
     """Query response serializer with results and metadata."""
@@ -12,9 +20,18 @@ class QueryResponseSerializer(serializers.Serializer):
     execution_time = serializers.FloatField(required=False)
     error = serializers.CharField(required=False)
     columns = serializers.ListField(child=serializers.CharField(), required=False)
+    row_count = serializers.IntegerField(required=False, allow_null=True)
+    llm_usage = serializers.DictField(required=False)
+    coalesced = serializers.BooleanField(required=False)
+    cache = serializers.DictField(required=False)
+    decomposed = serializers.BooleanField(required=False)
+    sub_queries = serializers.ListField(child=serializers.DictField(), required=False)
+    fallback = serializers.CharField(required=False, allow_null=True)
 
 class QueryHistorySerializer(serializers.ModelSerializer):
     """Query history serializer for displaying past queries."""
     class Meta:
         model = QueryHistory
-        fields = ['id', 'natural_query', 'generated_sql', 'execution_time', 'success', 'error_message', 'created_at']
\ No newline at end of file
+        fields = ['id', 'database', 'natural_query', 'generated_sql', 'execution_time', 'success', 'error_message', 'created_at',
+                  'total_latency', 'llm_latency', 'model_name', 'prompt_tokens', 'completion_tokens', 'cached_tokens',
+                  'row_count', 'result_bytes', 'decomposed', 'fallback']
\ No newline at end of file
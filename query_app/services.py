@@ -2,96 +2,507 @@
 Service layer for query processing.
 Applies DRY principles and provides reusable business logic.
 """
+import hashlib
+import json
+import logging
 import time
-from typing import Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from .models import QueryHistory
-from .database_inspector import DatabaseInspector
+from .database_inspector import DatabaseInspector, QueryExecutionError
 from .nl_to_sql import NLToSQLConverter
-from .config import DatabaseConfig, APIConfig, ConfigValidator
+from .model_router import ModelRouter, ModelStats
+from .sql_validator import SQLValidator, SQLValidationError
+from .admission import AdmissionRejected, get_limiter
+from .coalescing import SingleFlight, coalescing_key, normalize_question
+from .query_cache import QueryCache
+from .llm_resilience import LLMUnavailableError, template_sql
+from .config import DatabaseConfig, APIConfig, ServiceConfig, ConfigValidator
+from .target_registry import DatabaseTarget, get_target_registry
+from .schema_index import SchemaIndex
+
+logger = logging.getLogger(__name__)
+
+_single_flight = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight coordinator (lazy loading)."""
+    global _single_flight
+    if _single_flight is None:
+        config = ServiceConfig.get_coalescing_config()
+        _single_flight = SingleFlight(
+            shared=config['SHARED'],
+            lock_timeout=config['LOCK_TIMEOUT'],
+            result_ttl=config['RESULT_TTL'],
+            poll_interval=config['POLL_INTERVAL'],
+        )
+    return _single_flight
+
+
+_query_cache = None
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """Get the translation/result cache, or None when caching is disabled (lazy loading)."""
+    global _query_cache
+    config = ServiceConfig.get_query_cache_config()
+    if not config['ENABLED']:
+        return None
+    if _query_cache is None:
+        _query_cache = QueryCache(
+            alias=config['CACHE_ALIAS'],
+            translation_ttl=config['TRANSLATION_TTL'],
+            result_ttl=config['RESULT_TTL'],
+            max_result_bytes=config['MAX_RESULT_BYTES'],
+        )
+    return _query_cache
 
 
 class QueryService:
     """Service class for handling natural language queries."""
     
-    def __init__(self):
-        self._inspector = None
+    def __init__(self, database: Optional[str] = None, deadline: Optional[float] = None):
+        self.database = database or DatabaseConfig.DEFAULT_TARGET
+        # All model calls made for this request must finish by the deadline
+        self.deadline = deadline or time.time() + APIConfig.get_llm_client_config()['REQUEST_DEADLINE']
+        self._target = None
         self._converter = None
+        self._router = None
+        self._decomposed = False
     
-    def _get_inspector(self) -> DatabaseInspector:
-        """Get database inspector instance (lazy loading)."""
-        if self._inspector is None:
-            db_config = DatabaseConfig.get_external_db_config()
-            self._inspector = DatabaseInspector(db_config)
-        return self._inspector
+    def __enter__(self) -> 'QueryService':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Release the lease on the target database, if one was taken."""
+        if self._target is not None:
+            self._target.release()
+            self._target = None
+    
+    def _get_target(self) -> DatabaseTarget:
+        """Lease the pooled target database from the registry (lazy loading)."""
+        if self._target is None:
+            self._target = get_target_registry().acquire(self.database)
+        return self._target
+    
+    def get_inspector(self) -> DatabaseInspector:
+        """Get the target's pooled database inspector; usable until this service is closed."""
+        return self._get_target().inspector
     
     def _get_converter(self) -> NLToSQLConverter:
         """Get NL to SQL converter instance (lazy loading)."""
         if self._converter is None:
             openai_key = APIConfig.get_openai_key()
-            self._converter = NLToSQLConverter(openai_key)
+            self._converter = NLToSQLConverter(openai_key, deadline=self.deadline)
         return self._converter
     
+    def _get_router(self) -> ModelRouter:
+        """Get model router instance (lazy loading)."""
+        if self._router is None:
+            self._router = ModelRouter(APIConfig.get_model_routing_config())
+        return self._router
+    
     def validate_configuration(self) -> Tuple[bool, Optional[str]]:
         """
         Validate system configuration.
         Returns (is_valid, error_message).
         """
-        validation = ConfigValidator.validate_all()
+        validation = ConfigValidator.validate_all(self.database)
         if not all(validation.values()):
-            errors = ConfigValidator.get_validation_errors()
+            errors = ConfigValidator.get_validation_errors(self.database)
             return False, f"Configuration errors: {errors}"
         return True, None
     
-    def get_database_schema(self) -> Dict[str, Any]:
-        """Get database schema information."""
-        inspector = self._get_inspector()
-        return inspector.get_schema_info()
+    def get_database_schema(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get database schema information from the target's snapshot cache."""
+        return self._get_target().get_schema(refresh=refresh)
+    
+    def get_schema_index(self) -> SchemaIndex:
+        """Get the in-memory table/column index over the cached schema snapshot."""
+        return self._get_target().get_schema_index()
+    
+    def get_cached_schema(self) -> Optional[Dict[str, Any]]:
+        """Get the cached schema snapshot if fresh, without touching the database."""
+        return self._get_target().cached_schema()
+    
+    def get_schema_etag(self, schema_info: Dict[str, Any]) -> str:
+        """
+        Strong ETag for a schema snapshot of this target, row estimates included.
+        The target name is hashed with the rest so it does not leak into a header.
+        """
+        estimates = json.dumps(schema_info.get('row_estimates', {}), sort_keys=True)
+        source = '\x1f'.join((self.database, schema_info['fingerprint'], estimates))
+        return f'"schema-{hashlib.sha256(source.encode("utf-8")).hexdigest()[:40]}"'
+    
+    def get_history_etag(self, limit: int = 50) -> str:
+        """
+        Strong ETag for the history page, derived from the ids and timestamps it would contain.
+        Timestamps matter because TRUNCATE restarts MySQL AUTO_INCREMENT, so ids get reused.
+        """
+        rows = QueryHistory.objects.order_by('-created_at').values_list('id', 'created_at')[:limit]
+        source = ','.join(f"{pk}@{created_at.isoformat()}" for pk, created_at in rows)
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        return f'"history-{limit}-{digest[:32]}"'
     
-    def execute_natural_query(self, natural_query: str) -> Dict[str, Any]:
+    def execute_natural_query(self, natural_query: str, warming: bool = False) -> Dict[str, Any]:
         """
         Execute a natural language query.
-        Returns query results with metadata.
+        Returns query results with metadata. Warming runs always re-execute
+        and store the result with the longer warming TTL.
         """
         # Validate configuration
         is_valid, error = self.validate_configuration()
         if not is_valid:
             raise ValueError(error)
         
-        # Get components
-        inspector = self._get_inspector()
+        schema_info = self.get_database_schema()
+        
+        # Coalesce identical in-flight questions onto a single leader
+        coalescing = ServiceConfig.get_coalescing_config()
+        if not coalescing['ENABLED']:
+            return dict(self._run_natural_query(natural_query, schema_info, warming), coalesced=False)
+        
+        key = coalescing_key(self.database, normalize_question(natural_query), schema_info['fingerprint'])
+        result, shared = get_single_flight().do(
+            key, lambda: self._run_natural_query(natural_query, schema_info, warming), deadline=self.deadline
+        )
+        return dict(result, coalesced=shared)
+    
+    def execute_decomposed_query(self, natural_query: str, warming: bool = False) -> Dict[str, Any]:
+        """
+        Split a compound question into independent sub-questions and run them in
+        parallel, each on its own pooled connection. Results are returned side by
+        side in 'sub_queries'; a question that does not split runs as usual.
+        """
+        is_valid, error = self.validate_configuration()
+        if not is_valid:
+            raise ValueError(error)
+        
+        schema_info = self.get_database_schema()
+        try:
+            sub_questions = self._decompose(natural_query, schema_info)
+        except LLMUnavailableError as e:
+            logger.warning("Could not decompose question (%s), running it whole", e)
+            sub_questions = [natural_query]
+        if len(sub_questions) < 2:
+            return dict(self.execute_natural_query(natural_query, warming=warming), decomposed=False, sub_queries=[])
+        
+        self._decomposed = True
+        config = ServiceConfig.get_decomposition_config()
+        with ThreadPoolExecutor(max_workers=min(len(sub_questions), config['MAX_PARALLEL']),
+                                thread_name_prefix='sub-query') as executor:
+            outcomes = list(executor.map(lambda sub_question: self._run_sub_query(sub_question, warming),
+                                         sub_questions))
+        
+        succeeded = [sub_query for sub_query, error in outcomes if error is None]
+        if not succeeded:
+            raise outcomes[0][1]
+        
+        # Decomposition call plus every sub-query that actually called the model
+        usage = dict(self._get_converter().total_usage)
+        sub_usages = [sub_query['llm_usage'] for sub_query in succeeded if not sub_query['coalesced']]
+        for key in usage:
+            if key != 'latency':
+                usage[key] += sum(sub_usage.get(key) or 0 for sub_usage in sub_usages)
+        # Sub-queries call the model in parallel, so only the slowest adds wall-clock LLM time
+        usage['latency'] += max((sub_usage.get('latency') or 0 for sub_usage in sub_usages), default=0.0)
+        
+        # Sub-queries run side by side, so the slowest one is the database time of the request
+        return {
+            'generated_sql': ';\n'.join(sub_query['generated_sql'] for sub_query in succeeded),
+            'execution_time': max(sub_query['execution_time'] for sub_query in succeeded),
+            'columns': [],
+            'results': [],
+            'row_count': sum(sub_query['row_count'] or 0 for sub_query in succeeded),
+            'result_bytes': sum(sub_query['result_bytes'] for sub_query in succeeded),
+            'llm_usage': dict(
+                usage,
+                model=self._get_converter().last_usage.get('model') or '',
+                attempts=sum(sub_query['llm_usage'].get('attempts', 0) for sub_query in succeeded),
+                repairs=sum(sub_query['llm_usage'].get('repairs', 0) for sub_query in succeeded)
+            ),
+            'coalesced': False,
+            'fallback': next((sub_query['fallback'] for sub_query in succeeded if sub_query['fallback']), None),
+            'cache': {
+                'translation': all(sub_query['cache']['translation'] for sub_query in succeeded),
+                'result': all(sub_query['cache']['result'] for sub_query in succeeded),
+            },
+            'decomposed': True,
+            'sub_queries': [sub_query for sub_query, _ in outcomes],
+        }
+    
+    def _decompose(self, natural_query: str, schema_info: Dict[str, Any]) -> List[str]:
+        """Sub-questions for a question, from the cache or the fast model."""
+        config = ServiceConfig.get_decomposition_config()
+        query_cache = get_query_cache()
+        fingerprint = schema_info['fingerprint']
+        sub_questions = query_cache.get_decomposition(self.database, natural_query, fingerprint) if query_cache else None
+        if sub_questions is None:
+            sub_questions = self._get_converter().decompose_question(
+                natural_query, schema_info,
+                max_parts=config['MAX_SUB_QUERIES'],
+                model=config['MODEL'] or APIConfig.get_model_routing_config()['FAST_MODEL'],
+                max_tokens=config['MAX_TOKENS'],
+            )
+            if query_cache is not None:
+                query_cache.set_decomposition(self.database, natural_query, fingerprint, sub_questions)
+        return sub_questions
+    
+    def _run_sub_query(self, sub_question: str,
+                       warming: bool = False) -> Tuple[Dict[str, Any], Optional[Exception]]:
+        """Run one sub-question with its own service; failures are reported, not raised."""
+        try:
+            with QueryService(self.database, deadline=self.deadline) as sub_service:
+                query_data = sub_service.execute_natural_query(sub_question, warming=warming)
+        except Exception as e:
+            logger.warning("Sub-query %r failed: %s", sub_question, e)
+            error_info = ErrorHandler.handle_query_error(e, sub_question)
+            return {
+                'question': sub_question,
+                'error': error_info['error_message'],
+                'error_type': error_info['error_type'],
+            }, e
+        return dict(query_data, question=sub_question), None
+    
+    def _run_natural_query(self, natural_query: str, schema_info: Dict[str, Any],
+                           warming: bool = False) -> Dict[str, Any]:
+        """Convert, validate and execute a question against a schema snapshot."""
         converter = self._get_converter()
+        query_cache = get_query_cache()
+        fingerprint = schema_info['fingerprint']
+        
+        # Reuse a previously validated translation, regenerating if it no longer executes
+        cached = query_cache.get_translation(self.database, natural_query, fingerprint) if query_cache else None
+        if cached is not None:
+            try:
+                execution = self._execute_sql(cached['sql'], fingerprint, warming)
+            except QueryExecutionError as e:
+                logger.warning("Cached SQL failed (%s), regenerating", e)
+                query_cache.delete_translation(self.database, natural_query, fingerprint)
+            else:
+                usage = dict(converter.total_usage, model=cached['model'], attempts=0, repairs=0)
+                return self._build_response(cached['sql'], execution, usage, translation_cached=True)
         
-        # Get schema and convert query
-        schema_info = inspector.get_schema_info()
-        sql_query = converter.convert_to_sql(natural_query, schema_info)
+        validator = SQLValidator(schema_info)
+        try:
+            sql_query, execution, model, attempt, repairs = self._translate_and_execute(
+                converter, validator, natural_query, schema_info, warming
+            )
+        except LLMUnavailableError as e:
+            # Degraded provider: answer from the question's last good SQL or a template
+            fallback = self._fallback_sql(natural_query, schema_info, validator)
+            if fallback is None:
+                raise
+            sql_query, source = fallback
+            logger.warning("Model unavailable (%s), answering with %s SQL", e, source)
+            execution = self._execute_sql(sql_query, fingerprint, warming)
+            usage = dict(converter.total_usage, model='', attempts=0, repairs=0)
+            return self._build_response(sql_query, execution, usage, translation_cached=False, fallback=source)
+        
+        if query_cache is not None:
+            query_cache.set_translation(self.database, natural_query, fingerprint, sql_query, model)
+        usage = dict(converter.total_usage, model=model, attempts=attempt, repairs=repairs)
+        return self._build_response(sql_query, execution, usage, translation_cached=False)
+    
+    def _translate_and_execute(self, converter: NLToSQLConverter, validator: SQLValidator,
+                               natural_query: str, schema_info: Dict[str, Any],
+                               warming: bool = False) -> Tuple[str, Dict[str, Any], str, int, int]:
+        """
+        Try the routed model tiers in order until one produces SQL that validates and executes.
+        Returns (sql_query, execution, model, attempt, repairs).
+        """
+        fingerprint = schema_info['fingerprint']
+        tiers = self._get_router().route(natural_query, schema_info)
+        
+        for attempt, tier in enumerate(tiers, start=1):
+            llm_start = time.time()
+            try:
+                sql_query, repairs = self._generate_valid_sql(converter, validator, natural_query, schema_info, tier)
+            except SQLValidationError as e:
+                ModelStats.record(tier['model'], time.time() - llm_start, False)
+                if attempt == len(tiers):
+                    raise
+                logger.warning("SQL from %s failed validation (%s), escalating", tier['model'], e)
+                continue
+            except AdmissionRejected:
+                raise
+            except Exception:
+                ModelStats.record(tier['model'], time.time() - llm_start, False)
+                raise
+            llm_latency = time.time() - llm_start
+            
+            # Execute query, escalating to the next tier if the database rejects it
+            try:
+                execution = self._execute_sql(sql_query, fingerprint, warming)
+            except QueryExecutionError as e:
+                ModelStats.record(tier['model'], llm_latency, False)
+                if attempt == len(tiers):
+                    raise
+                logger.warning("SQL from %s failed (%s), escalating", tier['model'], e)
+                continue
+            ModelStats.record(tier['model'], llm_latency, True)
+            model = converter.last_usage.get('model') or tier['model']
+            return sql_query, execution, model, attempt, repairs
+    
+    def _fallback_sql(self, natural_query: str, schema_info: Dict[str, Any],
+                      validator: SQLValidator) -> Optional[Tuple[str, str]]:
+        """
+        SQL to serve when the model is unavailable, as (sql_query, source):
+        the last successful SQL for the same question, else a template query.
+        Only model-generated SQL counts as history, never an earlier fallback.
+        """
+        previous = (
+            QueryHistory.objects.filter(
+                database=self.database, success=True, natural_query__iexact=natural_query.strip(),
+                fallback='', decomposed=False,
+            )
+            .exclude(generated_sql='')
+            .order_by('-created_at')
+            .values_list('generated_sql', flat=True)
+            .first()
+        )
+        for sql_query, source in ((previous, 'history'), (template_sql(natural_query, schema_info), 'template')):
+            if not sql_query:
+                continue
+            try:
+                return validator.validate(sql_query), source
+            except SQLValidationError:
+                continue
+        return None
+    
+    def _execute_sql(self, sql_query: str, fingerprint: str, warming: bool = False) -> Dict[str, Any]:
+        """
+        Execute validated SQL, serving from the result cache when possible.
+        Returns {'query_result', 'execution_time', 'result_bytes', 'cached'}.
+        """
+        query_cache = get_query_cache()
+        if query_cache is not None and not warming:
+            cached = query_cache.get_result(self.database, sql_query, fingerprint)
+            if cached is not None:
+                return dict(cached, execution_time=0.0, cached=True)
         
-        # Execute query
         start_time = time.time()
-        query_result = inspector.execute_query(sql_query)
+        with get_limiter('db').slot():
+            query_result = self.get_inspector().execute_query(sql_query)
         execution_time = time.time() - start_time
         
-        # Prepare response
-        response_data = {
-            'generated_sql': sql_query,
+        results = query_result.get('results', [])
+        result_bytes = len(json.dumps(results, default=str, separators=(',', ':')))
+        if query_cache is not None:
+            ttl = ServiceConfig.get_cache_warming_config()['RESULT_TTL'] if warming else None
+            query_cache.set_result(self.database, sql_query, fingerprint,
+                                   query_result, execution_time, result_bytes, ttl=ttl)
+        return {
+            'query_result': query_result,
             'execution_time': execution_time,
+            'result_bytes': result_bytes,
+            'cached': False,
+        }
+    
+    @staticmethod
+    def _build_response(sql_query: str, execution: Dict[str, Any], llm_usage: Dict[str, Any],
+                        translation_cached: bool, fallback: Optional[str] = None) -> Dict[str, Any]:
+        query_result = execution['query_result']
+        results = query_result.get('results', [])
+        return {
+            'generated_sql': sql_query,
+            'execution_time': execution['execution_time'],
             'columns': query_result.get('columns', []),
-            'results': query_result.get('results', [])
+            'results': results,
+            'row_count': query_result.get('row_count', len(results)),
+            'result_bytes': execution['result_bytes'],
+            'llm_usage': llm_usage,
+            'cache': {'translation': translation_cached, 'result': execution['cached']},
+            'fallback': fallback,
         }
-        
-        return response_data
+    
+    def _generate_valid_sql(self, converter: NLToSQLConverter, validator: SQLValidator,
+                            natural_query: str, schema_info: Dict[str, Any],
+                            tier: Dict[str, Any]) -> Tuple[str, int]:
+        """
+        Convert a question and repair the SQL until it passes local validation.
+        Returns (sql_query, repairs_used); raises SQLValidationError when repairs run out.
+        """
+        max_repairs = APIConfig.get_sql_repair_attempts()
+        sql_query = converter.convert_to_sql(
+            natural_query, schema_info, model=tier['model'], max_tokens=tier['max_tokens']
+        )
+        for repairs in range(max_repairs + 1):
+            try:
+                return validator.validate(sql_query), repairs
+            except SQLValidationError as e:
+                if repairs == max_repairs:
+                    raise
+                logger.info("Repairing SQL from %s: %s", tier['model'], e)
+                sql_query = converter.repair_sql(
+                    natural_query, schema_info, sql_query, str(e),
+                    model=tier['model'], max_tokens=tier['max_tokens']
+                )
     
     def save_query_to_history(self, natural_query: str, sql_query: str, 
-                            execution_time: float, success: bool, 
-                            error_message: str = '') -> QueryHistory:
-        """Save query execution to history."""
+                            execution_time: Optional[float], success: bool, 
+                            error_message: str = '',
+                            metrics: Optional[Dict[str, Any]] = None) -> QueryHistory:
+        """Save query execution to history, with optional per-stage metrics."""
         return QueryHistory.objects.create(
+            database=self.database,
             natural_query=natural_query,
             generated_sql=sql_query,
             execution_time=execution_time,
             success=success,
-            error_message=error_message
+            error_message=error_message,
+            **(metrics or {})
         )
     
+    @staticmethod
+    def history_execution_time(query_data: Dict[str, Any]) -> Optional[float]:
+        """Database time to record; None when the result came from the cache and no query ran."""
+        if (query_data.get('cache') or {}).get('result'):
+            return None
+        return query_data['execution_time']
+    
+    @staticmethod
+    def history_metrics(query_data: Dict[str, Any], total_latency: float) -> Dict[str, Any]:
+        """
+        Extract the per-stage metrics stored with a history row.
+        Coalesced requests did not call the model, so they record no LLM cost.
+        """
+        metrics = {
+            'total_latency': total_latency,
+            'row_count': query_data.get('row_count'),
+            'result_bytes': query_data.get('result_bytes'),
+            'decomposed': bool(query_data.get('decomposed')),
+            'fallback': query_data.get('fallback') or '',
+        }
+        usage = query_data.get('llm_usage') or {}
+        metrics['model_name'] = usage.get('model') or ''
+        if not query_data.get('coalesced'):
+            metrics.update({
+                'llm_latency': usage.get('latency'),
+                'prompt_tokens': usage.get('prompt_tokens'),
+                'completion_tokens': usage.get('completion_tokens'),
+                'cached_tokens': usage.get('cached_tokens'),
+            })
+        return metrics
+    
+    def failure_metrics(self, total_latency: float) -> Dict[str, Any]:
+        """Metrics for a failed request: timing plus whatever the model calls cost."""
+        metrics = {'total_latency': total_latency, 'decomposed': self._decomposed}
+        if self._converter is not None and self._converter.total_usage['calls']:
+            usage = self._converter.total_usage
+            metrics.update({
+                'model_name': self._converter.last_usage.get('model') or '',
+                'llm_latency': usage['latency'],
+                'prompt_tokens': usage['prompt_tokens'],
+                'completion_tokens': usage['completion_tokens'],
+                'cached_tokens': usage['cached_tokens'],
+            })
+        return metrics
+    
     def get_query_history(self, limit: int = 50) -> list:
         """Get query history with pagination."""
         return list(QueryHistory.objects.all().order_by('-created_at')[:limit])
@@ -109,6 +520,12 @@ class ErrorHandler:
         """
         error_types = {
             'ValueError': 'Configuration Error',
+            'QueryExecutionError': 'Query Execution Error',
+            'SQLValidationError': 'SQL Validation Error',
+            'AdmissionRejected': 'Service Overloaded',
+            'CircuitOpenError': 'LLM Unavailable',
+            'LLMUnavailableError': 'LLM Unavailable',
+            'LLMTimeoutError': 'LLM Timeout Error',
             'ConnectionError': 'Database Connection Error',
             'TimeoutError': 'Query Timeout Error',
             'Exception': 'Query Execution Error'
@@ -127,10 +544,16 @@ class ErrorHandler:
         """Get user-friendly error suggestions."""
         error_message = str(error).lower()
         
-        if 'connection' in error_message:
+        if isinstance(error, AdmissionRejected):
+            return f"The service is busy. Please retry in {error.retry_after} seconds."
+        elif isinstance(error, LLMUnavailableError):
+            return "The language model is slow or unavailable right now. Please retry shortly."
+        elif 'connection' in error_message:
             return "Please check your database configuration in the .env file."
         elif 'timeout' in error_message:
             return "The query took too long to execute. Try simplifying your query."
+        elif isinstance(error, SQLValidationError):
+            return "The generated SQL did not match the database schema. Try rephrasing your query."
         elif 'syntax' in error_message:
             return "There was an issue with the generated SQL. Try rephrasing your query."
         else:
@@ -165,5 +588,12 @@ class ResponseBuilder:
             'generated_sql': query_data['generated_sql'],
             'execution_time': query_data['execution_time'],
             'columns': query_data.get('columns', []),
-            'results': query_data.get('results', [])
+            'results': query_data.get('results', []),
+            'row_count': query_data.get('row_count'),
+            'llm_usage': query_data.get('llm_usage', {}),
+            'coalesced': query_data.get('coalesced', False),
+            'cache': query_data.get('cache', {}),
+            'decomposed': query_data.get('decomposed', False),
+            'sub_queries': query_data.get('sub_queries', []),
+            'fallback': query_data.get('fallback')
         }
@@ -0,0 +1,325 @@
+"""
+Local validation of generated SQL.
+Catches malformed, non read-only or schema-mismatched queries before they reach the database.
+"""
+import re
+import sqlparse
+from sqlparse import tokens as T
+from sqlparse.lexer import Lexer
+from typing import Dict, Any, List, Set, Optional
+
+# sqlparse builds its shared lexer lazily and not thread-safely; a thread that
+# races the first initialization sees an empty lexer, so build it at import time
+Lexer.get_default_instance()
+
+FENCE_PATTERN = re.compile(r'```(?:[a-zA-Z]+)?\s*(.*?)```', re.DOTALL)
+LEADING_LABEL_PATTERN = re.compile(r'^\s*(?:sql(?:\s+query)?\s*:)', re.IGNORECASE)
+STATEMENT_START_PATTERN = re.compile(r'^\s*(?:SELECT|WITH|\()', re.IGNORECASE)
+WRITE_START_PATTERN = re.compile(
+    r'^\s*(?:INSERT|UPDATE|DELETE|MERGE|REPLACE|DROP|ALTER|CREATE|TRUNCATE|GRANT|REVOKE)\b', re.IGNORECASE
+)
+
+# Keywords after which the next names are tables rather than columns
+TABLE_KEYWORDS = {'FROM', 'JOIN', 'INNER JOIN', 'LEFT JOIN', 'RIGHT JOIN', 'FULL JOIN',
+                  'LEFT OUTER JOIN', 'RIGHT OUTER JOIN', 'FULL OUTER JOIN', 'CROSS JOIN',
+                  'NATURAL JOIN', 'STRAIGHT_JOIN'}
+
+# Keywords that start a clause, used to attribute column references
+CLAUSE_KEYWORDS = {'SELECT', 'WHERE', 'ON', 'USING', 'GROUP BY', 'ORDER BY', 'HAVING', 'LIMIT'}
+
+FORBIDDEN_KEYWORDS = {'INTO', 'FOR UPDATE', 'FOR SHARE', 'LOCK', 'GRANT', 'REVOKE',
+                      'TRUNCATE', 'CALL', 'EXEC', 'EXECUTE', 'COPY', 'LOAD', 'HANDLER',
+                      'SET', 'VACUUM', 'ANALYZE', 'OUTFILE', 'DUMPFILE'}
+# Functions with side effects (sessions, sequences, locks, files, sleeps) that a SELECT can call
+FORBIDDEN_FUNCTION_PATTERN = re.compile(
+    r'^(?:pg_terminate_backend|pg_cancel_backend|pg_reload_conf|pg_rotate_logfile|pg_switch_wal'
+    r'|pg_create_restore_point|pg_promote|pg_notify|pg_sleep\w*|pg_advisory\w*|pg_try_advisory\w*'
+    r'|pg_read_file|pg_read_binary_file|pg_ls_\w+|pg_stat_file|pg_file_\w+|lo_\w+|dblink\w*'
+    r'|set_config|setval|nextval|txid_current|sleep|benchmark|get_lock|release_lock'
+    r'|release_all_locks|load_file|sys_\w+)$',
+    re.IGNORECASE
+)
+
+
+class SQLValidationError(Exception):
+    """Raised when generated SQL fails local validation."""
+
+
+class SQLValidator:
+    """Validate generated SQL against a schema snapshot using sqlparse."""
+
+    def __init__(self, schema_info: Dict[str, Any]):
+        self.tables: Dict[str, Set[str]] = {
+            table_name.lower(): {column['name'].lower() for column in table_info['columns']}
+            for table_name, table_info in schema_info.get('tables', {}).items()
+        }
+
+    @staticmethod
+    def clean(sql: str) -> str:
+        """Strip markdown fences, labels, explanations and trailing semicolons from model output."""
+        sql = sql.strip()
+        fenced = FENCE_PATTERN.search(sql)
+        if fenced:
+            sql = fenced.group(1)
+        sql = sql.replace('```', '')
+        sql = LEADING_LABEL_PATTERN.sub('', sql).strip()
+
+        # Drop prose lines the model put before the statement
+        lines = sql.splitlines()
+        for index, line in enumerate(lines):
+            if STATEMENT_START_PATTERN.match(line):
+                sql = '\n'.join(lines[index:])
+                break
+            if WRITE_START_PATTERN.match(line):
+                break
+        return sql.strip().rstrip(';').strip()
+
+    def validate(self, sql: str) -> str:
+        """
+        Validate a query and return its cleaned form.
+        Raises SQLValidationError describing the first problem found.
+        """
+        sql = self.clean(sql)
+        if not sql:
+            raise SQLValidationError("The model returned an empty query.")
+
+        statements = [stmt for stmt in sqlparse.parse(sql) if stmt.token_first(skip_cm=True)]
+        if len(statements) != 1:
+            raise SQLValidationError(f"Expected exactly one SQL statement, found {len(statements)}.")
+
+        statement = statements[0]
+        self._check_read_only(statement)
+        self._check_references(statement)
+        return sql
+
+    def column_references(self, sql: str) -> Dict[str, Any]:
+        """
+        Resolve the column references of a validated query to real tables.
+        Returns {'aliases': {alias: table}, 'references': [(clause, table, column), ...]}
+        where clause is the enclosing keyword (WHERE, ON, ORDER BY, GROUP BY, ...).
+        """
+        statement = sqlparse.parse(self.clean(sql))[0]
+        tokens = [token for token in statement.flatten()
+                  if not token.is_whitespace and token.ttype not in T.Comment]
+        tables, aliases, _ = self._collect_sources(tokens)
+        real_tables = sorted(name for name in tables if name in self.tables)
+        qualifiers: Dict[str, Optional[str]] = {name: name for name in real_tables}
+        qualifiers.update(aliases)
+
+        references = []
+        clause = None
+        for index, token in enumerate(tokens):
+            keyword = self._keyword(token)
+            if keyword in CLAUSE_KEYWORDS or keyword in TABLE_KEYWORDS:
+                clause = keyword
+                continue
+            if not self._is_name(token) or self._is_table_position(tokens, index):
+                continue
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if following is not None and following.match(T.Punctuation, ('(', '.')):
+                continue
+
+            name = self._name(token)
+            if index >= 2 and tokens[index - 1].match(T.Punctuation, '.'):
+                table = qualifiers.get(self._name(tokens[index - 2]))
+            else:
+                owners = [table_name for table_name in real_tables if name in self.tables[table_name]]
+                table = owners[0] if len(owners) == 1 else None
+            if table is not None and name in self.tables.get(table, ()):
+                references.append((clause, table, name))
+
+        return {
+            'aliases': {alias: table for alias, table in aliases.items() if table is not None},
+            'references': references,
+        }
+
+    def _check_read_only(self, statement) -> None:
+        if statement.get_type() != 'SELECT':
+            raise SQLValidationError(
+                f"Only read-only SELECT queries are allowed, got {statement.get_type()}."
+            )
+        tokens = [token for token in statement.flatten()
+                  if not token.is_whitespace and token.ttype not in T.Comment]
+        for token, following in zip(tokens, tokens[1:]):
+            if (following.match(T.Punctuation, '(') and token.ttype in (T.Name, T.Keyword)
+                    and FORBIDDEN_FUNCTION_PATTERN.match(token.value)):
+                raise SQLValidationError(f"Statement calls forbidden function {token.value}().")
+        for token in tokens:
+            if token.ttype in (T.Keyword.DML, T.Keyword.DDL) and token.normalized != 'SELECT':
+                raise SQLValidationError(f"Statement contains forbidden keyword {token.normalized}.")
+            if token.ttype in T.Keyword and token.normalized in FORBIDDEN_KEYWORDS:
+                raise SQLValidationError(f"Statement contains forbidden keyword {token.normalized}.")
+
+    def _check_references(self, statement) -> None:
+        tokens = [token for token in statement.flatten()
+                  if not token.is_whitespace and token.ttype not in T.Comment]
+
+        tables, aliases, virtual = self._collect_sources(tokens)
+        unknown = sorted(name for name in tables if name not in self.tables and name not in virtual)
+        if unknown:
+            raise SQLValidationError(
+                f"Unknown table(s): {', '.join(unknown)}. Available tables: {', '.join(sorted(self.tables))}."
+            )
+
+        # Qualifier -> real table for column checks; None for CTEs and derived tables
+        qualifiers: Dict[str, Optional[str]] = {name: name for name in tables}
+        qualifiers.update(aliases)
+        referenced_columns: Set[str] = set()
+        for name in tables:
+            referenced_columns |= self.tables.get(name, set())
+        # Columns of CTEs and subqueries are not known, so unqualified names cannot be checked
+        check_unqualified = not virtual and not any(target is None for target in aliases.values())
+        known_names = set(aliases) | self._collect_output_aliases(tokens)
+
+        for index, token in enumerate(tokens):
+            if not self._is_name(token) or self._is_table_position(tokens, index):
+                continue
+            name = self._name(token)
+            previous = tokens[index - 1] if index > 0 else None
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+
+            if following is not None and following.match(T.Punctuation, '('):
+                continue  # function call
+            if following is not None and following.match(T.Punctuation, '.'):
+                continue  # qualifier, checked with the column that follows
+            if previous is not None and previous.match(T.Punctuation, '.'):
+                qualifier = self._name(tokens[index - 2]) if index >= 2 else ''
+                if qualifier not in qualifiers:
+                    if qualifier in self.tables or index < 3 or not tokens[index - 3].match(T.Punctuation, '.'):
+                        raise SQLValidationError(f"Unknown table or alias '{qualifier}' in '{qualifier}.{name}'.")
+                    continue
+                table = qualifiers[qualifier]
+                if table is not None and table in self.tables and name not in self.tables[table]:
+                    raise SQLValidationError(
+                        f"Unknown column '{name}' on table '{table}'. "
+                        f"Available columns: {', '.join(sorted(self.tables[table]))}."
+                    )
+                continue
+            if not check_unqualified or name in known_names or name in referenced_columns:
+                continue
+            raise SQLValidationError(
+                f"Unknown column '{name}'. It does not exist on any referenced table "
+                f"({', '.join(sorted(tables))})."
+            )
+
+    def _collect_sources(self, tokens: List) -> tuple:
+        """Return (tables, aliases, virtual tables) referenced by the statement."""
+        tables: Set[str] = set()
+        aliases: Dict[str, Optional[str]] = {}
+        virtual: Set[str] = set()
+
+        for index, token in enumerate(tokens):
+            # CTE names: WITH name AS ( ... ), name AS ( ... )
+            if self._is_name(token) and index + 2 < len(tokens) \
+                    and tokens[index + 1].match(T.Keyword, 'AS') \
+                    and tokens[index + 2].match(T.Punctuation, '(') \
+                    and index > 0 and (tokens[index - 1].match(T.Keyword.CTE, 'WITH')
+                                       or tokens[index - 1].match(T.Punctuation, ',')):
+                virtual.add(self._name(token))
+                continue
+
+            if not self._is_table_position(tokens, index):
+                continue
+
+            # Skip schema qualifiers like public.users
+            if index + 2 < len(tokens) and tokens[index + 1].match(T.Punctuation, '.'):
+                continue
+            table = self._name(token)
+            tables.add(table)
+            alias = self._alias_after(tokens, index)
+            if alias:
+                aliases[alias] = table if table not in virtual else None
+
+        # Derived tables: ( SELECT ... ) [AS] alias
+        depth_starts = []
+        for index, token in enumerate(tokens):
+            if token.match(T.Punctuation, '('):
+                depth_starts.append(index)
+            elif token.match(T.Punctuation, ')') and depth_starts:
+                start = depth_starts.pop()
+                if start > 0 and self._keyword(tokens[start - 1]) in TABLE_KEYWORDS:
+                    alias = self._alias_after(tokens, index)
+                    if alias:
+                        aliases[alias] = None
+        return tables, aliases, virtual
+
+    def _collect_output_aliases(self, tokens: List) -> Set[str]:
+        """Names introduced as column aliases (explicit AS or implicit)."""
+        names = set()
+        for index, token in enumerate(tokens):
+            if not self._is_name(token) or index == 0:
+                continue
+            previous = tokens[index - 1]
+            if previous.match(T.Keyword, 'AS'):
+                names.add(self._name(token))
+            elif previous.match(T.Punctuation, ')') or previous.ttype in T.Literal or self._is_name(previous):
+                names.add(self._name(token))
+        return names
+
+    def _alias_after(self, tokens: List, index: int) -> Optional[str]:
+        position = index + 1
+        if position < len(tokens) and tokens[position].match(T.Keyword, 'AS'):
+            position += 1
+        if position < len(tokens) and self._is_name(tokens[position]):
+            return self._name(tokens[position])
+        return None
+
+    def _is_table_position(self, tokens: List, index: int) -> bool:
+        """Whether the name at index is a table in a FROM/JOIN list."""
+        token = tokens[index]
+        # Tables named like keywords (user, order) are lexed as keywords
+        if not (self._is_name(token) or (token.ttype in T.Keyword and self._name(token) in self.tables)):
+            return False
+        position = index - 1
+        # Step back over a schema qualifier (schema.table)
+        if position >= 1 and tokens[position].match(T.Punctuation, '.') and self._is_name(tokens[position - 1]):
+            position -= 2
+        if position < 0:
+            return False
+        previous = tokens[position]
+        if self._keyword(previous) in TABLE_KEYWORDS:
+            return not self._inside_expression(tokens, position)
+        # Comma separated FROM lists: FROM a, b c, d
+        if previous.match(T.Punctuation, ','):
+            return self._in_from_list(tokens, position)
+        return False
+
+    def _in_from_list(self, tokens: List, comma_index: int) -> bool:
+        depth = 0
+        for position in range(comma_index - 1, -1, -1):
+            token = tokens[position]
+            if token.match(T.Punctuation, ')'):
+                depth += 1
+            elif token.match(T.Punctuation, '('):
+                if depth == 0:
+                    return False
+                depth -= 1
+            elif depth == 0 and token.ttype in T.Keyword:
+                return token.normalized == 'FROM'
+        return False
+
+    def _inside_expression(self, tokens: List, index: int) -> bool:
+        """FROM inside function calls such as EXTRACT(YEAR FROM col) is not a table clause."""
+        depth = 0
+        for position in range(index - 1, -1, -1):
+            token = tokens[position]
+            if token.match(T.Punctuation, ')'):
+                depth += 1
+            elif token.match(T.Punctuation, '('):
+                if depth == 0:
+                    following = tokens[position + 1] if position + 1 < len(tokens) else None
+                    return not (following is not None and following.ttype in (T.Keyword.DML, T.Keyword.CTE))
+                depth -= 1
+        return False
+
+    @staticmethod
+    def _is_name(token) -> bool:
+        return token.ttype in (T.Name, T.Literal.String.Symbol)
+
+    @staticmethod
+    def _name(token) -> str:
+        return token.value.strip('"`[]').lower()
+
+    @staticmethod
+    def _keyword(token) -> str:
+        return ' '.join(token.normalized.split()) if token.ttype in T.Keyword else ''
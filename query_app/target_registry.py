@@ -0,0 +1,186 @@
+"""
+Registry of named target databases.
+Each active target owns a connection pool and a schema snapshot cache; idle targets are evicted LRU.
+Requests lease the target they use, so an evicted target's pool closes only after its last lease is released.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from .admission import get_limiter
+from .config import DatabaseConfig
+from .database_inspector import ConnectionPool, DatabaseInspector
+from .schema_index import SchemaIndex
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseTarget:
+    """One target database with its pooled inspector and cached schema snapshot."""
+
+    def __init__(self, name: str, config: Dict[str, Any], pool_size: int,
+                 pool_timeout: float, schema_ttl: float):
+        self.name = name
+        self.engine = config['engine']
+        self.schema_ttl = schema_ttl
+        probe = DatabaseInspector(config)
+        self.pool = ConnectionPool(probe.get_connection, max_size=pool_size, timeout=pool_timeout)
+        self.inspector = DatabaseInspector(config, pool=self.pool)
+        self.last_used = time.time()
+        self._schema: Optional[Dict[str, Any]] = None
+        self._schema_loaded_at = 0.0
+        self._schema_lock = threading.Lock()
+        self._schema_index: Optional[SchemaIndex] = None
+        self._leases = 0
+        self._retired = False
+        self._lease_lock = threading.Lock()
+
+    def get_schema(self, refresh: bool = False) -> Dict[str, Any]:
+        """Return the schema snapshot, introspecting only when missing, stale or forced."""
+        schema_info = None if refresh else self.cached_schema()
+        if schema_info is not None:
+            return schema_info
+
+        # One introspection per target at a time; waiters reuse its snapshot
+        with self._schema_lock:
+            schema_info = None if refresh else self.cached_schema()
+            if schema_info is None:
+                with get_limiter('db').slot():
+                    schema_info = self.inspector.get_schema_info()
+                self._schema = schema_info
+                self._schema_loaded_at = time.time()
+            return schema_info
+
+    def get_schema_index(self, refresh: bool = False) -> SchemaIndex:
+        """Return the search index for the current snapshot, rebuilding it when the snapshot changes."""
+        schema_info = self.get_schema(refresh=refresh)
+        index = self._schema_index
+        if index is None or index.schema_info is not schema_info:
+            index = self._schema_index = SchemaIndex(schema_info)
+        return index
+
+    def cached_schema(self) -> Optional[Dict[str, Any]]:
+        """Return the cached snapshot if it is still fresh, without touching the database."""
+        if self._schema is not None and time.time() - self._schema_loaded_at < self.schema_ttl:
+            return self._schema
+        return None
+
+    def invalidate_schema(self) -> None:
+        self._schema = None
+        self._schema_index = None
+
+    def acquire(self) -> None:
+        with self._lease_lock:
+            self._leases += 1
+
+    def release(self) -> None:
+        """Release a lease, closing the pool if the target was evicted while leased."""
+        with self._lease_lock:
+            self._leases -= 1
+            self.last_used = time.time()
+            close_now = self._retired and self._leases == 0
+        if close_now:
+            self.pool.close_all()
+
+    def close(self) -> None:
+        """Close the pool now, or when the last in-flight request releases its lease."""
+        with self._lease_lock:
+            self._retired = True
+            close_now = self._leases == 0
+        if close_now:
+            self.pool.close_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'engine': self.engine,
+            'idle_seconds': time.time() - self.last_used,
+            'schema_cached': self.cached_schema() is not None,
+            'leases': self._leases,
+            'pool': self.pool.stats(),
+        }
+
+
+class TargetRegistry:
+    """Process-wide LRU of active targets, bounded in count and idle time."""
+
+    def __init__(self, max_active: int, idle_timeout: float, pool_size: int,
+                 pool_timeout: float, schema_ttl: float):
+        self.max_active = max_active
+        self.idle_timeout = idle_timeout
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.schema_ttl = schema_ttl
+        self._targets: "OrderedDict[str, DatabaseTarget]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str) -> DatabaseTarget:
+        """
+        Lease an active target by name, creating it on first use.
+        The caller must release() it when done so an eviction can close its pool.
+        """
+        evicted = []
+        with self._lock:
+            target = self._targets.get(name)
+            if target is None:
+                config = DatabaseConfig.get_target_config(name)
+                target = DatabaseTarget(name, config, self.pool_size, self.pool_timeout, self.schema_ttl)
+                self._targets[name] = target
+            self._targets.move_to_end(name)
+            target.last_used = time.time()
+            # Lease before releasing the lock so a concurrent eviction cannot close it under us
+            target.acquire()
+            evicted = self._collect_evictions()
+
+        for stale in evicted:
+            logger.info("Evicting idle target database %s", stale.name)
+            stale.close()
+        return target
+
+    def peek(self, name: str) -> Optional[DatabaseTarget]:
+        """Get an already active target without creating it or touching its LRU position."""
+        with self._lock:
+            return self._targets.get(name)
+
+    def evict(self, name: str) -> None:
+        with self._lock:
+            target = self._targets.pop(name, None)
+        if target is not None:
+            target.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            targets = list(self._targets.values())
+        return {target.name: target.stats() for target in targets}
+
+    def _collect_evictions(self) -> list:
+        """Pop least recently used targets beyond the size limit or idle too long."""
+        evicted = []
+        now = time.time()
+        while len(self._targets) > 1:
+            name, oldest = next(iter(self._targets.items()))
+            over_limit = len(self._targets) > self.max_active
+            if not over_limit and now - oldest.last_used < self.idle_timeout:
+                break
+            evicted.append(self._targets.pop(name))
+        return evicted
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_target_registry() -> TargetRegistry:
+    """Get the process-wide target registry (lazy loading)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            config = DatabaseConfig.get_registry_config()
+            _registry = TargetRegistry(
+                max_active=config['MAX_ACTIVE_TARGETS'],
+                idle_timeout=config['IDLE_TIMEOUT'],
+                pool_size=config['POOL_SIZE'],
+                pool_timeout=config['POOL_TIMEOUT'],
+                schema_ttl=config['SCHEMA_CACHE_TTL'],
+            )
+        return _registry
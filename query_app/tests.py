@@ -0,0 +1,223 @@
+"""
+Tests for the OpenAI resilience controls: circuit breaker transitions, the
+hedge delay and the request deadline cut-off, run against a local HTTP stub
+of the chat completions endpoint.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from .llm_resilience import CircuitBreaker, CircuitOpenError, Hedger, LLMTimeoutError, LLMUnavailableError
+from .model_router import ModelStats
+from .nl_to_sql import NLToSQLConverter
+
+MESSAGES = [{'role': 'user', 'content': 'How many users?'}]
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint answering with the server's scripted status and delays."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            delay = server.delays.pop(0) if server.delays else 0
+        time.sleep(delay)
+        if server.status != 200:
+            payload = {'error': {'message': 'stub failure'}}
+        else:
+            payload = {
+                'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': 'SELECT COUNT(*) FROM users'}}],
+                'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+            }
+        data = json.dumps(payload).encode('utf-8')
+        try:
+            self.send_response(server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            pass  # the client gave up on this call
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOpenAITestCase(SimpleTestCase):
+    """Runs a stub OpenAI server and gives each test a fresh breaker and hedger."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenAIHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.status = 200
+        self.server.delays = []
+        self.server.calls = 0
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.hedger = Hedger(enabled=True, percentile=95, min_delay=0.05, max_inflight=2)
+        settings = override_settings(LLM_CLIENT={
+            'BASE_URL': f'http://127.0.0.1:{self.server.server_port}/v1',
+            'TIMEOUT': 1.0,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name, value in (('get_circuit_breaker', self.breaker), ('get_hedger', self.hedger)):
+            patcher = mock.patch(f'query_app.nl_to_sql.{name}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def complete(self, deadline=None) -> str:
+        return NLToSQLConverter('test-key', deadline=deadline)._complete(MESSAGES, 'gpt-4o-mini', 50)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'closed')
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError) as raised:
+            breaker.before_call()
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record(False)
+        breaker.record(True)
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_half_open_admits_one_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record(False)
+        time.sleep(0.02)
+        breaker.before_call()
+        self.assertEqual(breaker.state, 'half_open')
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_probe_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record(False)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record(True)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_probe_failure_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.01)
+        for _ in range(5):
+            breaker.record(False)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+
+    def test_unattempted_probe_frees_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record(False)
+        time.sleep(0.02)
+        breaker.before_call()
+        breaker.record(None)
+        breaker.before_call()
+        self.assertEqual(breaker.state, 'half_open')
+
+
+class HedgerTests(SimpleTestCase):
+
+    def test_delay_follows_recorded_call_latency(self):
+        hedger = Hedger(enabled=True, percentile=95, min_delay=0.05, max_inflight=1)
+        self.assertEqual(hedger.delay('gpt-4o-mini'), 0.0)
+        for _ in range(20):
+            hedger.record('gpt-4o-mini', 0.2)
+        self.assertEqual(hedger.delay('gpt-4o-mini'), 0.2)
+
+    def test_no_hedge_without_samples(self):
+        hedger = Hedger(enabled=True, percentile=95, min_delay=0.05, max_inflight=1)
+        self.assertEqual(hedger.call(lambda timeout: 'answer', 'gpt-4o-mini', 1.0), 'answer')
+        self.assertEqual(hedger.stats()['hedged'], 0)
+
+    def test_deadline_bounds_wait_when_budget_is_spent(self):
+        hedger = Hedger(enabled=True, percentile=95, min_delay=0.05, max_inflight=1)
+        hedger.record('gpt-4o-mini', 0.05)
+        hedger._budget.acquire()
+        start = time.time()
+        with self.assertRaises(LLMTimeoutError):
+            hedger.call(lambda timeout: time.sleep(2), 'gpt-4o-mini', 5.0, deadline=start + 0.3)
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_deadline_bounds_wait_for_hedged_pair(self):
+        hedger = Hedger(enabled=True, percentile=95, min_delay=0.05, max_inflight=1)
+        hedger.record('gpt-4o-mini', 0.05)
+        start = time.time()
+        with self.assertRaises(LLMTimeoutError):
+            hedger.call(lambda timeout: time.sleep(2), 'gpt-4o-mini', 5.0, deadline=start + 0.3)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(hedger.stats()['hedged'], 1)
+
+
+class ConverterResilienceTests(StubOpenAITestCase):
+
+    def test_answer_records_call_latency(self):
+        self.assertEqual(self.complete(), 'SELECT COUNT(*) FROM users')
+        self.assertGreater(self.hedger.delay('gpt-4o-mini'), 0)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_hedge_beats_slow_primary(self):
+        for _ in range(20):
+            self.hedger.record('gpt-4o-mini', 0.05)
+        # Slow whole conversions must not push the hedge delay up
+        with mock.patch.dict(ModelStats._stats, clear=True):
+            for _ in range(20):
+                ModelStats.record('gpt-4o-mini', 1.0, False)
+            self.server.delays = [0.8]
+            start = time.time()
+            self.assertEqual(self.complete(), 'SELECT COUNT(*) FROM users')
+        self.assertLess(time.time() - start, 0.6)
+        self.assertEqual(self.hedger.stats()['hedge_wins'], 1)
+
+    def test_server_errors_open_breaker(self):
+        self.server.status = 500
+        for _ in range(2):
+            with self.assertRaises(LLMUnavailableError):
+                self.complete()
+        self.assertEqual(self.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.complete()
+        self.assertEqual(self.server.calls, 2)
+
+    def test_timeout_counts_as_failure(self):
+        self.server.delays = [2]
+        with self.assertRaises(LLMTimeoutError):
+            self.complete(deadline=time.time() + 0.3)
+        self.assertEqual(self.breaker.stats()['consecutive_failures'], 1)
+
+    def test_expired_deadline_skips_call_and_breaker(self):
+        for _ in range(5):
+            with self.assertRaises(LLMTimeoutError):
+                self.complete(deadline=time.time() - 1)
+        self.assertEqual(self.server.calls, 0)
+        self.assertEqual(self.breaker.stats()['consecutive_failures'], 0)
+        self.assertEqual(self.breaker.state, 'closed')
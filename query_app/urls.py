@@ -1,9 +1,20 @@
 from django.urls import path
-from .views import SchemaView, QueryView, HistoryView, ClearHistoryView
+from .views import (
+    SchemaView, SchemaTableListView, SchemaTableDetailView, SchemaSearchView,
+    QueryView, HistoryView, ClearHistoryView, StatsView, DatabaseListView, AnalyticsView,
+    IndexAdvisorView,
+)
 
 urlpatterns = [
+    path('databases/', DatabaseListView.as_view(), name='list_databases'),
     path('schema/', SchemaView.as_view(), name='get_schema'),
+    path('schema/tables/', SchemaTableListView.as_view(), name='schema_tables'),
+    path('schema/tables/<str:table_name>/', SchemaTableDetailView.as_view(), name='schema_table_detail'),
+    path('schema/search/', SchemaSearchView.as_view(), name='schema_search'),
     path('query/', QueryView.as_view(), name='execute_query'),
     path('history/', HistoryView.as_view(), name='query_history'),
     path('history/clear/', ClearHistoryView.as_view(), name='clear_query_history'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('advisor/indexes/', IndexAdvisorView.as_view(), name='index_advisor'),
 ]
\ No newline at end of file
@@ -1,19 +1,111 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import QueryHistory
 from .serializers import QueryRequestSerializer, QueryResponseSerializer, QueryHistorySerializer
 from .services import QueryService, ErrorHandler, ResponseBuilder
+from .analytics import QueryAnalytics, parse_window
+from .admission import AdmissionRejected, get_admission_stats
+from .model_router import ModelStats
+from .sql_validator import SQLValidationError
+from .llm_resilience import LLMTimeoutError, LLMUnavailableError, get_llm_resilience_stats
+from .config import APIConfig, DatabaseConfig, ServiceConfig, UnknownTargetError
+from .index_advisor import IndexAdvisor
+from .history_retention import truncate_history
+from .target_registry import get_target_registry
+from .schema_index import SchemaIndex
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag (in any encoding)."""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = {tag.removeprefix('W/') for tag in parse_etags(header)}
+    return '*' in candidates or etag in candidates
+
+
+def not_modified_response(request, etag: str) -> Response:
+    """304 echoing the validator the client holds, so encoded variants stay consistent."""
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    matching = [tag for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+                if tag.removeprefix('W/') == etag]
+    response['ETag'] = matching[0] if matching else etag
+    return response
+
+
+def overloaded_response(error: AdmissionRejected) -> Response:
+    """429/503 response with Retry-After for requests shed by admission control."""
+    error_info = ErrorHandler.handle_query_error(error, "admission")
+    response = Response(
+        ResponseBuilder.error_response(error_info['error_message'], error_info['error_type']),
+        status=error.status_code,
+    )
+    response['Retry-After'] = str(error.retry_after)
+    return response
 
 
 class SchemaView(APIView):
-    """CBV: Get database schema using environment configuration."""
+    """CBV: Get the schema of a target database (?database=name, ?refresh=1)."""
 
     def get(self, request):
         try:
-            query_service = QueryService()
-            schema_info = query_service.get_database_schema()
-            return Response(ResponseBuilder.success_response(schema_info, "Schema retrieved successfully"))
+            with QueryService(request.query_params.get('database')) as query_service:
+                refresh = request.query_params.get('refresh') in ('1', 'true')
+
+                # Answer revalidation from the cached snapshot before touching the database
+                cached = None if refresh else query_service.get_cached_schema()
+                if cached is not None and etag_matches(request, query_service.get_schema_etag(cached)):
+                    return not_modified_response(request, query_service.get_schema_etag(cached))
+
+                schema_info = query_service.get_database_schema(refresh=refresh)
+                etag = query_service.get_schema_etag(schema_info)
+                if etag_matches(request, etag):
+                    return not_modified_response(request, etag)
+                response = Response(ResponseBuilder.success_response(schema_info, "Schema retrieved successfully"))
+                response['ETag'] = etag
+                return response
+        except UnknownTargetError as e:
+            return Response(ResponseBuilder.error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except Exception as e:
+            error_info = ErrorHandler.handle_query_error(e, "schema_request")
+            return Response(
+                ResponseBuilder.error_response(error_info['error_message']),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class SchemaIndexView(APIView, ABC):
+    """
+    Base CBV for the granular schema endpoints, served from the in-memory index
+    of the cached snapshot. Subclasses implement build() returning the payload,
+    or None when the requested item does not exist.
+    """
+
+    def get(self, request, **kwargs):
+        try:
+            with QueryService(request.query_params.get('database')) as query_service:
+                index = query_service.get_schema_index()
+                etag_source = f"{query_service.get_schema_etag(index.schema_info)}|{request.get_full_path()}"
+                etag = f'"{hashlib.sha256(etag_source.encode("utf-8")).hexdigest()[:40]}"'
+                if etag_matches(request, etag):
+                    return not_modified_response(request, etag)
+
+                data = self.build(index, request, **kwargs)
+                if data is None:
+                    return Response(ResponseBuilder.error_response("Not found"), status=status.HTTP_404_NOT_FOUND)
+                response = Response(ResponseBuilder.success_response(data, "Schema retrieved successfully"))
+                response['ETag'] = etag
+                return response
+        except UnknownTargetError as e:
+            return Response(ResponseBuilder.error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+        except AdmissionRejected as e:
+            return overloaded_response(e)
         except Exception as e:
             error_info = ErrorHandler.handle_query_error(e, "schema_request")
             return Response(
@@ -21,6 +113,47 @@ class SchemaView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    @abstractmethod
+    def build(self, index: SchemaIndex, request, **kwargs):
+        """Payload for the request, or None when the requested item does not exist."""
+
+    @staticmethod
+    def int_param(request, name: str, default: int, maximum: int) -> int:
+        try:
+            return min(max(int(request.query_params.get(name, default)), 0), maximum)
+        except ValueError:
+            return default
+
+
+class SchemaTableListView(SchemaIndexView):
+    """CBV: Paginated table list with column counts and estimated rows."""
+
+    def build(self, index, request, **kwargs):
+        offset = self.int_param(request, 'offset', 0, index.table_count)
+        limit = self.int_param(request, 'limit', 100, 1000)
+        return {'count': index.table_count, 'tables': index.list_tables(offset, limit)}
+
+
+class SchemaTableDetailView(SchemaIndexView):
+    """CBV: Columns and relationships of a single table."""
+
+    def build(self, index, request, table_name=None):
+        return index.get_table(table_name)
+
+
+class SchemaSearchView(SchemaIndexView):
+    """CBV: Search table and column names (?q=, ?mode=prefix|substring, ?limit=)."""
+
+    def build(self, index, request, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        mode = request.query_params.get('mode', 'substring')
+        if mode not in ('prefix', 'substring'):
+            mode = 'substring'
+        limit = self.int_param(request, 'limit', 50, 500)
+        if not query:
+            return {'tables': [], 'columns': []}
+        return index.search(query, mode=mode, limit=limit)
+
 
 class QueryView(APIView):
     """CBV: Execute natural language query using environment configuration."""
@@ -31,34 +164,53 @@ class QueryView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         natural_query = serializer.validated_data['natural_query']
-        query_service = QueryService()
+        query_service = QueryService(serializer.validated_data['database'])
+        start_time = time.time()
 
         try:
-            query_data = query_service.execute_natural_query(natural_query)
+            if serializer.validated_data['decompose']:
+                query_data = query_service.execute_decomposed_query(natural_query)
+            else:
+                query_data = query_service.execute_natural_query(natural_query)
             query_service.save_query_to_history(
                 natural_query=natural_query,
                 sql_query=query_data['generated_sql'],
-                execution_time=query_data['execution_time'],
+                execution_time=query_service.history_execution_time(query_data),
                 success=True,
+                metrics=query_service.history_metrics(query_data, time.time() - start_time),
             )
             return Response(QueryResponseSerializer(query_data).data)
+        except AdmissionRejected as e:
+            # Shed requests are not recorded so history writes don't add to the overload
+            return overloaded_response(e)
         except Exception as e:
             try:
                 query_service.save_query_to_history(
                     natural_query=natural_query,
                     sql_query='',
-                    execution_time=0,
+                    execution_time=None,
                     success=False,
                     error_message=str(e),
+                    metrics=query_service.failure_metrics(time.time() - start_time),
                 )
             except:
                 pass
 
             error_info = ErrorHandler.handle_query_error(e, natural_query)
+            if isinstance(e, SQLValidationError):
+                error_status = status.HTTP_422_UNPROCESSABLE_ENTITY
+            elif isinstance(e, LLMTimeoutError):
+                error_status = status.HTTP_504_GATEWAY_TIMEOUT
+            elif isinstance(e, LLMUnavailableError):
+                error_status = status.HTTP_503_SERVICE_UNAVAILABLE
+            else:
+                error_status = status.HTTP_500_INTERNAL_SERVER_ERROR
             return Response(
-                ResponseBuilder.error_response(error_info['error_message']),
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                ResponseBuilder.error_response(error_info['error_message'], error_info['error_type']),
+                status=error_status,
             )
+        finally:
+            query_service.close()
 
 
 class HistoryView(APIView):
@@ -67,9 +219,14 @@ class HistoryView(APIView):
     def get(self, request):
         try:
             query_service = QueryService()
+            etag = query_service.get_history_etag()
+            if etag_matches(request, etag):
+                return not_modified_response(request, etag)
             history = query_service.get_query_history()
             serializer = QueryHistorySerializer(history, many=True)
-            return Response(serializer.data)
+            response = Response(serializer.data)
+            response['ETag'] = etag
+            return response
         except Exception as e:
             error_info = ErrorHandler.handle_query_error(e, "history_request")
             return Response(
@@ -79,15 +236,97 @@ class HistoryView(APIView):
 
 
 class ClearHistoryView(APIView):
-    """CBV: Delete all query history entries."""
+    """CBV: Delete all query history entries (TRUNCATE, no archival)."""
 
     def delete(self, request):
         try:
-            QueryHistory.objects.all().delete()
+            truncate_history()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Exception as e:
             error_info = ErrorHandler.handle_query_error(e, "clear_history_request")
             return Response(
                 ResponseBuilder.error_response(error_info['error_message']),
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
\ No newline at end of file
+            )
+
+
+class StatsView(APIView):
+    """CBV: Model routing stats, admission queue depth/wait times and LLM breaker/hedging state."""
+
+    def get(self, request):
+        stats = {
+            'models': ModelStats.snapshot(),
+            'routing': APIConfig.get_model_routing_config(),
+            'admission': get_admission_stats(),
+            'llm': get_llm_resilience_stats(),
+            'targets': get_target_registry().stats(),
+        }
+        return Response(ResponseBuilder.success_response(stats, "Stats retrieved successfully"))
+
+
+class DatabaseListView(APIView):
+    """CBV: List configured target databases and which are currently active."""
+
+    def get(self, request):
+        active = get_target_registry().stats()
+        databases = [
+            {'name': name, 'active': name in active}
+            for name in DatabaseConfig.get_target_names()
+        ]
+        return Response(ResponseBuilder.success_response(databases, "Databases retrieved successfully"))
+
+
+class AnalyticsView(APIView):
+    """CBV: Latency percentiles, error rates and top slow/expensive questions (?window=24h, ?database=)."""
+
+    def get(self, request):
+        try:
+            window = parse_window(request.query_params.get('window', '24h'))
+        except ValueError as e:
+            return Response(ResponseBuilder.error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            analytics = QueryAnalytics(window, database=request.query_params.get('database'))
+            return Response(ResponseBuilder.success_response(analytics.report(), "Analytics retrieved successfully"))
+        except Exception as e:
+            error_info = ErrorHandler.handle_query_error(e, "analytics_request")
+            return Response(
+                ResponseBuilder.error_response(error_info['error_message']),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class IndexAdvisorView(APIView):
+    """CBV: Ranked index suggestions for slow generated queries (?database=, ?threshold=, ?window=)."""
+
+    def get(self, request):
+        config = ServiceConfig.get_index_advisor_config()
+        try:
+            threshold = float(request.query_params.get('threshold', config['LATENCY_THRESHOLD']))
+            window = request.query_params.get('window')
+            window = parse_window(window) if window else None
+        except ValueError as e:
+            return Response(ResponseBuilder.error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with QueryService(request.query_params.get('database')) as query_service:
+                advisor = IndexAdvisor(
+                    query_service.database,
+                    query_service.get_inspector(),
+                    query_service.get_database_schema(),
+                    threshold=threshold,
+                    window=window,
+                    max_queries=config['MAX_QUERIES'],
+                    min_table_rows=config['MIN_TABLE_ROWS'],
+                )
+                return Response(ResponseBuilder.success_response(advisor.advise(), "Index suggestions retrieved successfully"))
+        except UnknownTargetError as e:
+            return Response(ResponseBuilder.error_response(str(e)), status=status.HTTP_400_BAD_REQUEST)
+        except AdmissionRejected as e:
+            return overloaded_response(e)
+        except Exception as e:
+            error_info = ErrorHandler.handle_query_error(e, "index_advisor_request")
+            return Response(
+                ResponseBuilder.error_response(error_info['error_message']),
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
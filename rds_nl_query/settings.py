@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -27,6 +28,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'query_app.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,9 +75,78 @@ EXTERNAL_DATABASE = {
     'ENGINE': os.getenv('DB_ENGINE', 'postgresql'),
 }
 
+# Additional named target databases, selected per request with "database".
+# JSON object of name -> {"HOST", "PORT", "NAME", "USER", "PASSWORD", "ENGINE"}
+EXTERNAL_DATABASES = json.loads(os.getenv('EXTERNAL_DATABASES', '{}'))
+
+# Per-target connection pools and schema caches; idle targets are evicted LRU
+TARGET_REGISTRY = {
+    'MAX_ACTIVE_TARGETS': int(os.getenv('MAX_ACTIVE_TARGETS', 16)),
+    'IDLE_TIMEOUT': float(os.getenv('TARGET_IDLE_TIMEOUT', 900)),
+    'POOL_SIZE': int(os.getenv('TARGET_POOL_SIZE', 5)),
+    'POOL_TIMEOUT': float(os.getenv('TARGET_POOL_TIMEOUT', 10)),
+    'SCHEMA_CACHE_TTL': float(os.getenv('SCHEMA_CACHE_TTL', 300)),
+}
+
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Model routing: simple questions go to the fast model first and escalate
+# to the strong model when the generated SQL fails
+MODEL_ROUTING = {
+    'FAST_MODEL': os.getenv('OPENAI_FAST_MODEL', 'gpt-4o-mini'),
+    'STRONG_MODEL': os.getenv('OPENAI_STRONG_MODEL', 'gpt-4'),
+    'FAST_MAX_TOKENS': int(os.getenv('OPENAI_FAST_MAX_TOKENS', 300)),
+    'STRONG_MAX_TOKENS': int(os.getenv('OPENAI_STRONG_MAX_TOKENS', 500)),
+    'MAX_SCHEMA_TABLES': int(os.getenv('ROUTING_MAX_SCHEMA_TABLES', 40)),
+    'MAX_QUESTION_WORDS': int(os.getenv('ROUTING_MAX_QUESTION_WORDS', 25)),
+    'MAX_TOUCHED_TABLES': int(os.getenv('ROUTING_MAX_TOUCHED_TABLES', 1)),
+}
+
+# Times invalid generated SQL is sent back to the model before escalating
+SQL_REPAIR_MAX_ATTEMPTS = int(os.getenv('SQL_REPAIR_MAX_ATTEMPTS', 2))
+
+# OpenAI client resilience. TIMEOUT bounds each call and REQUEST_DEADLINE all
+# model calls of one request. A duplicate call is hedged once a call outlives
+# the model's HEDGE_PERCENTILE latency. After BREAKER_FAILURE_THRESHOLD
+# consecutive timeouts/5xx the breaker fails fast for BREAKER_RESET_TIMEOUT
+# seconds. BASE_URL can point at a local stub server for testing.
+LLM_CLIENT = {
+    'BASE_URL': os.getenv('OPENAI_BASE_URL') or None,
+    'TIMEOUT': float(os.getenv('OPENAI_TIMEOUT', 20)),
+    'REQUEST_DEADLINE': float(os.getenv('LLM_REQUEST_DEADLINE', 30)),
+    'HEDGE_ENABLED': os.getenv('LLM_HEDGE_ENABLED', 'True').lower() == 'true',
+    'HEDGE_PERCENTILE': float(os.getenv('LLM_HEDGE_PERCENTILE', 95)),
+    'HEDGE_MIN_DELAY': float(os.getenv('LLM_HEDGE_MIN_DELAY', 0.5)),
+    'HEDGE_MAX_INFLIGHT': int(os.getenv('LLM_HEDGE_MAX_INFLIGHT', 4)),
+    'BREAKER_FAILURE_THRESHOLD': int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5)),
+    'BREAKER_RESET_TIMEOUT': float(os.getenv('LLM_BREAKER_RESET_TIMEOUT', 30)),
+}
+
+# Identical in-flight questions share one conversion and execution.
+# SHARED also coalesces across workers through the cache backend.
+QUERY_COALESCING = {
+    'ENABLED': os.getenv('QUERY_COALESCING_ENABLED', 'True').lower() == 'true',
+    'SHARED': os.getenv('QUERY_COALESCING_SHARED', 'False').lower() == 'true',
+    'LOCK_TIMEOUT': float(os.getenv('QUERY_COALESCING_LOCK_TIMEOUT', 60)),
+    'RESULT_TTL': float(os.getenv('QUERY_COALESCING_RESULT_TTL', 30)),
+    'POLL_INTERVAL': float(os.getenv('QUERY_COALESCING_POLL_INTERVAL', 0.05)),
+}
+
+# Per-worker concurrency limits and wait queues for the LLM and database
+# stages; requests beyond them are shed with 503 and Retry-After
+ADMISSION_CONTROL = {
+    'LLM_MAX_CONCURRENCY': int(os.getenv('LLM_MAX_CONCURRENCY', 4)),
+    'LLM_MAX_QUEUE': int(os.getenv('LLM_MAX_QUEUE', 16)),
+    'LLM_MAX_WAIT': float(os.getenv('LLM_MAX_WAIT', 10)),
+    'DB_MAX_CONCURRENCY': int(os.getenv('DB_MAX_CONCURRENCY', 8)),
+    'DB_MAX_QUEUE': int(os.getenv('DB_MAX_QUEUE', 32)),
+    'DB_MAX_WAIT': float(os.getenv('DB_MAX_WAIT', 5)),
+    'RATE_LIMIT_RETRIES': int(os.getenv('OPENAI_RATE_LIMIT_RETRIES', 3)),
+    'RATE_LIMIT_BACKOFF': float(os.getenv('OPENAI_RATE_LIMIT_BACKOFF', 0.5)),
+    'RATE_LIMIT_MAX_BACKOFF': float(os.getenv('OPENAI_RATE_LIMIT_MAX_BACKOFF', 8)),
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -96,4 +167,66 @@ REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Responses smaller than this are sent uncompressed
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+
+# Index advisor: queries at or above this execution time (seconds) are EXPLAINed
+INDEX_ADVISOR = {
+    'LATENCY_THRESHOLD': float(os.getenv('INDEX_ADVISOR_LATENCY_THRESHOLD', 1.0)),
+    'MAX_QUERIES': int(os.getenv('INDEX_ADVISOR_MAX_QUERIES', 50)),
+    'MIN_TABLE_ROWS': int(os.getenv('INDEX_ADVISOR_MIN_TABLE_ROWS', 1000)),
+}
+
+# Cache backend for the query caches and shared coalescing. The default
+# local-memory cache is per process: warming from the management command and
+# sharing between workers need a shared backend, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Question -> SQL translations and SQL -> result caches (TTLs in seconds)
+QUERY_CACHE = {
+    'ENABLED': os.getenv('QUERY_CACHE_ENABLED', 'True').lower() == 'true',
+    'TRANSLATION_TTL': float(os.getenv('QUERY_CACHE_TRANSLATION_TTL', 86400)),
+    'RESULT_TTL': float(os.getenv('QUERY_CACHE_RESULT_TTL', 300)),
+    'MAX_RESULT_BYTES': int(os.getenv('QUERY_CACHE_MAX_RESULT_BYTES', 1048576)),
+}
+
+# Opt-in splitting of compound questions ("decompose": true) into sub-queries
+# that run in parallel; MODEL defaults to OPENAI_FAST_MODEL
+QUERY_DECOMPOSITION = {
+    'MAX_SUB_QUERIES': int(os.getenv('DECOMPOSITION_MAX_SUB_QUERIES', 4)),
+    'MAX_PARALLEL': int(os.getenv('DECOMPOSITION_MAX_PARALLEL', 4)),
+    'MODEL': os.getenv('DECOMPOSITION_MODEL') or None,
+}
+
+# Off-peak warming of the hottest questions (manage.py warm_query_cache).
+# Warmed results live RESULT_TTL seconds, so keep INTERVAL (--loop re-warm
+# period) at or below it and RESULT_TTL close to QUERY_CACHE_RESULT_TTL.
+CACHE_WARMING = {
+    'TOP_QUESTIONS': int(os.getenv('CACHE_WARMING_TOP_QUESTIONS', 20)),
+    'HISTORY_WINDOW': os.getenv('CACHE_WARMING_HISTORY_WINDOW', '7d'),
+    'CONCURRENCY': int(os.getenv('CACHE_WARMING_CONCURRENCY', 2)),
+    'OFF_PEAK_START': os.getenv('CACHE_WARMING_OFF_PEAK_START', '01:00'),
+    'OFF_PEAK_END': os.getenv('CACHE_WARMING_OFF_PEAK_END', '05:00'),
+    'INTERVAL': float(os.getenv('CACHE_WARMING_INTERVAL', 600)),
+    'RESULT_TTL': float(os.getenv('CACHE_WARMING_RESULT_TTL', 600)),
+}
+
+# Query history retention (manage.py purge_query_history). Purged rows are
+# archived as gzip JSONL under ARCHIVE_DIR first; set it empty to skip archival.
+HISTORY_RETENTION = {
+    'MAX_AGE_DAYS': int(os.getenv('HISTORY_MAX_AGE_DAYS', 90)),
+    'MAX_ROWS': int(os.getenv('HISTORY_MAX_ROWS', 100000)),
+    'BATCH_SIZE': int(os.getenv('HISTORY_PURGE_BATCH_SIZE', 1000)),
+    'BATCH_PAUSE': float(os.getenv('HISTORY_PURGE_BATCH_PAUSE', 0.05)),
+    'ARCHIVE_DIR': os.getenv('HISTORY_ARCHIVE_DIR', str(BASE_DIR / 'archive')),
+    'INTERVAL': float(os.getenv('HISTORY_PURGE_INTERVAL', 3600)),
+}